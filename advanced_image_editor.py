@@ -5,21 +5,280 @@ Advanced image editing system for Nano Banana Image Generator
 
 import json
 import time
+import asyncio
 import base64
-from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+import functools
+import contextlib
+import sys
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass
+from types import MappingProxyType
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import numpy as np
 from PIL import Image, ImageDraw, ImageFilter
 import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 console = Console()
 
-@dataclass
+# dataclass(slots=True) needs Python 3.10; older interpreters get regular dataclasses
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Maximum number of edit results memoized per editor instance
+RESULT_CACHE_MAX_ENTRIES = 256
+
+# Send edit requests over an HTTP/2 httpx client instead of requests (needs httpx[http2])
+USE_HTTPX = False
+
+# Maximum in-flight API calls for batch_edit_async
+ASYNC_BATCH_CONCURRENCY = 16
+
+# Most recent edit operations kept in an editor's history
+EDIT_HISTORY_MAX_ENTRIES = 1024
+
+# Remote source images up to this size are kept in memory, as raw bytes, for repeated local edits
+SOURCE_CACHE_MAX_BYTES = 1024 * 1024
+
+# Maximum number of cached source images kept per editor instance
+SOURCE_CACHE_MAX_ENTRIES = 16
+
+# Read size used when streaming source images for local edits
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Batch operation types where repeating an identical step has no further effect
+IDEMPOTENT_OPERATIONS = frozenset({"style_transfer"})
+
+def _dumps_sorted(payload: Dict[str, Any]) -> bytes:
+    """Serialize a payload to canonical (key-sorted) JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+def _intern_values(table: Dict[str, str]) -> Dict[str, str]:
+    """Intern the prompt strings of a static table so every lookup shares one object"""
+    return {key: sys.intern(value) for key, value in table.items()}
+
+def _freeze_presets(table: Dict[str, Dict[str, str]]) -> Dict[str, MappingProxyType]:
+    """Intern each preset's prompt and wrap the preset in a read-only view"""
+    return {
+        name: MappingProxyType({**preset, "prompt": sys.intern(preset["prompt"])})
+        for name, preset in table.items()
+    }
+
+# Preset tables are static, so they are built once per process and shared read-only
+_STYLE_PRESETS = MappingProxyType(_freeze_presets({
+    "van_gogh": {
+        "prompt": "in the style of Vincent van Gogh, post-impressionist, swirling brushstrokes, vibrant colors",
+        "description": "Van Gogh's post-impressionist style"
+    },
+    "picasso": {
+        "prompt": "in the style of Pablo Picasso, cubist, abstract, geometric forms",
+        "description": "Picasso's cubist style"
+    },
+    "monet": {
+        "prompt": "in the style of Claude Monet, impressionist, soft brushstrokes, natural lighting",
+        "description": "Monet's impressionist style"
+    },
+    "anime": {
+        "prompt": "anime style, manga, japanese animation, cel shading, vibrant colors",
+        "description": "Anime/manga style"
+    },
+    "photorealistic": {
+        "prompt": "photorealistic, hyperrealistic, detailed, sharp focus, professional photography",
+        "description": "Photorealistic style"
+    },
+    "watercolor": {
+        "prompt": "watercolor painting, soft colors, flowing, artistic, traditional painting",
+        "description": "Watercolor painting style"
+    },
+    "oil_painting": {
+        "prompt": "oil painting, classical art, rich colors, brushstrokes, traditional painting",
+        "description": "Classical oil painting style"
+    },
+    "digital_art": {
+        "prompt": "digital art, concept art, modern illustration, vibrant, detailed",
+        "description": "Modern digital art style"
+    },
+    "sketch": {
+        "prompt": "pencil sketch, line art, drawing, monochrome, artistic",
+        "description": "Pencil sketch style"
+    },
+    "vintage": {
+        "prompt": "vintage style, retro, aged, sepia tones, classic photography",
+        "description": "Vintage/retro style"
+    }
+}))
+
+_FILTER_PRESETS = MappingProxyType({
+    "blur": {
+        "type": "blur",
+        "parameters": {"radius": 5},
+        "description": "Soft blur effect"
+    },
+    "sharpen": {
+        "type": "sharpen",
+        "parameters": {},
+        "description": "Enhance image sharpness"
+    },
+    "emboss": {
+        "type": "emboss",
+        "parameters": {},
+        "description": "Embossed effect"
+    },
+    "edge_enhance": {
+        "type": "edge_enhance",
+        "parameters": {},
+        "description": "Enhance edges"
+    },
+    "smooth": {
+        "type": "smooth",
+        "parameters": {},
+        "description": "Smooth image"
+    },
+    "contour": {
+        "type": "contour",
+        "parameters": {},
+        "description": "Contour effect"
+    },
+    "detail": {
+        "type": "detail",
+        "parameters": {},
+        "description": "Enhance details"
+    }
+})
+
+# Table previews of the style prompts, truncated to 50 characters
+_STYLE_PROMPT_PREVIEWS = MappingProxyType({
+    name: preset["prompt"][:50] + "..." if len(preset["prompt"]) > 50 else preset["prompt"]
+    for name, preset in _STYLE_PRESETS.items()
+})
+
+# Prompt templates for color adjustments; "{percent}" is filled from the intensity
+_COLOR_ADJUSTMENT_PROMPTS = MappingProxyType(_intern_values({
+    "brightness": "increase brightness by {percent:.0f}%",
+    "contrast": "increase contrast by {percent:.0f}%",
+    "saturation": "increase color saturation by {percent:.0f}%",
+    "warmth": "add warm tones, golden hour lighting",
+    "coolness": "add cool tones, blue hour lighting",
+    "vintage": "apply vintage color grading, sepia tones",
+    "high_contrast": "apply high contrast, dramatic lighting",
+    "pastel": "apply pastel color palette, soft colors"
+}))
+
+_FILTER_PROMPTS = MappingProxyType(_intern_values({
+    "blur": "apply soft blur effect, dreamy atmosphere",
+    "sharpen": "enhance sharpness, crisp details",
+    "emboss": "apply embossed effect, raised appearance",
+    "edge_enhance": "enhance edges, define boundaries",
+    "smooth": "apply smoothing, soft appearance",
+    "contour": "apply contour effect, outlined appearance",
+    "detail": "enhance fine details, texture"
+}))
+
+# Filters PIL can apply locally in milliseconds instead of a generation round trip
+_LOCAL_FILTERS = MappingProxyType({
+    "blur": ImageFilter.GaussianBlur(radius=_FILTER_PRESETS["blur"]["parameters"]["radius"]),
+    "sharpen": ImageFilter.SHARPEN,
+    "emboss": ImageFilter.EMBOSS,
+    "edge_enhance": ImageFilter.EDGE_ENHANCE,
+    "smooth": ImageFilter.SMOOTH,
+    "contour": ImageFilter.CONTOUR,
+    "detail": ImageFilter.DETAIL
+})
+
+# Color adjustments that are plain per-pixel transforms and need no generation model
+_LOCAL_COLOR_ADJUSTMENTS = frozenset({"brightness", "contrast", "saturation"})
+
+# ITU-R BT.601 luma weights, matching PIL's RGB -> L conversion
+_LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+def _adjust_colors(pixels: np.ndarray, adjustment_type: str, intensity: float) -> np.ndarray:
+    """Apply a brightness/contrast/saturation boost to an RGB uint8 array"""
+    arr = pixels.astype(np.float32)
+    factor = np.float32(1.0 + intensity)
+    
+    if adjustment_type == "brightness":
+        arr *= factor
+    elif adjustment_type == "contrast":
+        arr -= 128.0
+        arr *= factor
+        arr += 128.0
+    elif adjustment_type == "saturation":
+        gray = (arr @ _LUMA_WEIGHTS)[..., np.newaxis]
+        arr -= gray
+        arr *= factor
+        arr += gray
+    else:
+        raise ValueError(f"Unsupported local color adjustment: {adjustment_type}")
+    
+    np.clip(arr, 0, 255, out=arr)
+    return arr.astype(np.uint8)
+
+def _create_async_client() -> Optional["httpx.AsyncClient"]:
+    """Create an async client for batch fan-out, preferring HTTP/2 when h2 is installed"""
+    if httpx is None:
+        return None
+    
+    limits = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    try:
+        return httpx.AsyncClient(http2=True, limits=limits, timeout=120.0)
+    except ImportError:
+        return httpx.AsyncClient(limits=limits, timeout=120.0)
+
+@functools.lru_cache(maxsize=1)
+def _style_presets_table() -> Table:
+    """Build the style preset table once; presets never change at runtime"""
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Style", style="cyan", width=15)
+    table.add_column("Description", style="green", width=40)
+    table.add_column("Prompt", style="yellow", width=50)
+    
+    for style_name, style_info in _STYLE_PRESETS.items():
+        table.add_row(
+            style_name.replace("_", " ").title(),
+            style_info["description"],
+            _STYLE_PROMPT_PREVIEWS[style_name]
+        )
+    
+    return table
+
+@functools.lru_cache(maxsize=1)
+def _filter_presets_table() -> Table:
+    """Build the filter preset table once; presets never change at runtime"""
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Filter", style="cyan", width=15)
+    table.add_column("Description", style="green", width=30)
+    table.add_column("Type", style="yellow", width=15)
+    
+    for filter_name, filter_info in _FILTER_PRESETS.items():
+        table.add_row(
+            filter_name.replace("_", " ").title(),
+            filter_info["description"],
+            filter_info["type"]
+        )
+    
+    return table
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class EditOperation:
     """Data class for edit operations"""
     type: str  # "inpaint", "outpaint", "style_transfer", "color_adjust", "filter"
@@ -30,95 +289,163 @@ class EditOperation:
 class AdvancedImageEditor:
     """Advanced image editing system with AI-powered features"""
     
-    def __init__(self, api_base: str = "http://127.0.0.1:10000"):
+    def __init__(self, api_base: str = "http://127.0.0.1:10000", use_httpx: bool = USE_HTTPX):
         self.api_base = api_base
-        self.edit_history = []
-        self.style_presets = self._load_style_presets()
-        self.filter_presets = self._load_filter_presets()
-    
-    def _load_style_presets(self) -> Dict[str, Dict[str, Any]]:
-        """Load style transfer presets"""
-        return {
-            "van_gogh": {
-                "prompt": "in the style of Vincent van Gogh, post-impressionist, swirling brushstrokes, vibrant colors",
-                "description": "Van Gogh's post-impressionist style"
-            },
-            "picasso": {
-                "prompt": "in the style of Pablo Picasso, cubist, abstract, geometric forms",
-                "description": "Picasso's cubist style"
-            },
-            "monet": {
-                "prompt": "in the style of Claude Monet, impressionist, soft brushstrokes, natural lighting",
-                "description": "Monet's impressionist style"
-            },
-            "anime": {
-                "prompt": "anime style, manga, japanese animation, cel shading, vibrant colors",
-                "description": "Anime/manga style"
-            },
-            "photorealistic": {
-                "prompt": "photorealistic, hyperrealistic, detailed, sharp focus, professional photography",
-                "description": "Photorealistic style"
-            },
-            "watercolor": {
-                "prompt": "watercolor painting, soft colors, flowing, artistic, traditional painting",
-                "description": "Watercolor painting style"
-            },
-            "oil_painting": {
-                "prompt": "oil painting, classical art, rich colors, brushstrokes, traditional painting",
-                "description": "Classical oil painting style"
-            },
-            "digital_art": {
-                "prompt": "digital art, concept art, modern illustration, vibrant, detailed",
-                "description": "Modern digital art style"
-            },
-            "sketch": {
-                "prompt": "pencil sketch, line art, drawing, monochrome, artistic",
-                "description": "Pencil sketch style"
-            },
-            "vintage": {
-                "prompt": "vintage style, retro, aged, sepia tones, classic photography",
-                "description": "Vintage/retro style"
-            }
+        self.session = self._create_session()
+        self.client = self._create_http2_client() if use_httpx else None
+        self.edit_history = deque(maxlen=EDIT_HISTORY_MAX_ENTRIES)
+        self.style_presets = _STYLE_PRESETS
+        self.filter_presets = _FILTER_PRESETS
+        self._remote_batch_supported = None
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        self._source_cache = OrderedDict()
+        self._source_cache_lock = threading.Lock()
+        
+        # Batch operation type -> handler taking (image_url, operation)
+        self._op_dispatch = {
+            "style_transfer": lambda url, op: self.style_transfer(url, op.get("style_preset"), op.get("custom_prompt")),
+            "color_adjust": lambda url, op: self.color_adjustment(url, op.get("adjustment_type"), op.get("intensity", 0.5)),
+            "filter": lambda url, op: self.apply_filter(url, op.get("filter_preset"))
+        }
+        
+        # Batch operation type -> request builder taking (operation)
+        self._request_dispatch = {
+            "style_transfer": lambda op: self._style_transfer_request(op.get("style_preset"), op.get("custom_prompt")),
+            "color_adjust": lambda op: self._color_adjustment_request(op.get("adjustment_type"), op.get("intensity", 0.5)),
+            "filter": lambda op: self._filter_request(op.get("filter_preset"))
         }
     
-    def _load_filter_presets(self) -> Dict[str, Dict[str, Any]]:
-        """Load image filter presets"""
+    def _create_session(self) -> requests.Session:
+        """Create a pooled HTTP session shared by all edit calls"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def _create_http2_client(self) -> Optional["httpx.Client"]:
+        """Create an HTTP/2 client so concurrent edits share one multiplexed connection"""
+        if httpx is None:
+            console.print("[yellow]⚠️ httpx is not installed, using requests for edit calls[/yellow]")
+            return None
+        
+        try:
+            return httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                timeout=120.0
+            )
+        except ImportError:
+            console.print("[yellow]⚠️ HTTP/2 support (h2) is not installed, using requests for edit calls[/yellow]")
+            return None
+    
+    def _cached_result(self, cache_key: str) -> Optional[str]:
+        """Return a memoized result URL, refreshing its LRU position"""
+        with self._result_cache_lock:
+            if cache_key in self._result_cache:
+                self._result_cache.move_to_end(cache_key)
+                return self._result_cache[cache_key]
+        return None
+    
+    def _store_result(self, cache_key: str, result_url: str):
+        """Memoize a result URL, evicting the least recently used entry"""
+        with self._result_cache_lock:
+            self._result_cache[cache_key] = result_url
+            if len(self._result_cache) > RESULT_CACHE_MAX_ENTRIES:
+                self._result_cache.popitem(last=False)
+    
+    def _post_edit(self, payload: Dict[str, Any]) -> Tuple[bool, str]:
+        """POST an edit request, returning (True, result_url) or (False, error)"""
+        # The same canonical bytes are hashed for the cache key and sent as the body
+        body = _dumps_sorted(payload)
+        cache_key = hashlib.blake2b(body).hexdigest()
+        
+        cached = self._cached_result(cache_key)
+        if cached is not None:
+            return True, cached
+        
+        try:
+            if self.client is not None:
+                response = self.client.post(
+                    f"{self.api_base}/v1/image/generations",
+                    content=body,
+                    headers={"Content-Type": "application/json"}
+                )
+                ok = response.is_success
+            else:
+                response = self.session.post(
+                    f"{self.api_base}/v1/image/generations",
+                    data=body,
+                    headers={"Content-Type": "application/json"},
+                    timeout=120
+                )
+                ok = response.ok
+            
+            if not ok:
+                return False, f"HTTP {response.status_code}"
+            
+            data = response.json()
+            result_url = data["data"][0]["url"]
+            
+        except Exception as e:
+            return False, str(e)
+        
+        self._store_result(cache_key, result_url)
+        return True, result_url
+    
+    async def _post_edit_async(self, client: "httpx.AsyncClient", payload: Dict[str, Any]) -> Tuple[bool, str]:
+        """Async counterpart of _post_edit sharing the same result cache"""
+        body = _dumps_sorted(payload)
+        cache_key = hashlib.blake2b(body).hexdigest()
+        
+        cached = self._cached_result(cache_key)
+        if cached is not None:
+            return True, cached
+        
+        try:
+            response = await client.post(
+                f"{self.api_base}/v1/image/generations",
+                content=body,
+                headers={"Content-Type": "application/json"}
+            )
+            
+            if not response.is_success:
+                return False, f"HTTP {response.status_code}"
+            
+            data = response.json()
+            result_url = data["data"][0]["url"]
+            
+        except Exception as e:
+            return False, str(e)
+        
+        self._store_result(cache_key, result_url)
+        return True, result_url
+    
+    def clear_cache(self):
+        """Forget all memoized edit results"""
+        with self._result_cache_lock:
+            self._result_cache.clear()
+    
+    def _record_edit(self, request: Dict[str, Any], image_url: str, result_url: str) -> Dict[str, Any]:
+        """Record a completed edit in the history and build its result"""
+        operation = EditOperation(
+            type=request["type"],
+            parameters={**request["parameters"], "original_url": image_url},
+            description=request["description"],
+            confidence=request["confidence"]
+        )
+        
+        self.edit_history.append(operation)
+        
         return {
-            "blur": {
-                "type": "blur",
-                "parameters": {"radius": 5},
-                "description": "Soft blur effect"
-            },
-            "sharpen": {
-                "type": "sharpen",
-                "parameters": {},
-                "description": "Enhance image sharpness"
-            },
-            "emboss": {
-                "type": "emboss",
-                "parameters": {},
-                "description": "Embossed effect"
-            },
-            "edge_enhance": {
-                "type": "edge_enhance",
-                "parameters": {},
-                "description": "Enhance edges"
-            },
-            "smooth": {
-                "type": "smooth",
-                "parameters": {},
-                "description": "Smooth image"
-            },
-            "contour": {
-                "type": "contour",
-                "parameters": {},
-                "description": "Contour effect"
-            },
-            "detail": {
-                "type": "detail",
-                "parameters": {},
-                "description": "Enhance details"
-            }
+            "success": True,
+            "result_url": result_url,
+            "operation": operation
         }
     
     def inpaint_image(self, image_url: str, mask_description: str, replacement_prompt: str) -> Dict[str, Any]:
@@ -128,44 +455,32 @@ class AdvancedImageEditor:
         # Create inpaint prompt
         inpaint_prompt = f"Remove {mask_description} and replace with {replacement_prompt}, seamless integration, natural looking"
         
-        try:
-            response = requests.post(
-                f"{self.api_base}/v1/image/generations",
-                json={
-                    "prompt": inpaint_prompt,
-                    "image_url": image_url,
-                    "type": "inpaint"
-                },
-                timeout=120
-            )
-            
-            if response.ok:
-                data = response.json()
-                result_url = data["data"][0]["url"]
-                
-                operation = EditOperation(
-                    type="inpaint",
-                    parameters={
-                        "mask_description": mask_description,
-                        "replacement_prompt": replacement_prompt,
-                        "original_url": image_url
-                    },
-                    description=f"Inpainted: {mask_description} → {replacement_prompt}",
-                    confidence=0.85
-                )
-                
-                self.edit_history.append(operation)
-                
-                return {
-                    "success": True,
-                    "result_url": result_url,
-                    "operation": operation
-                }
-            else:
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        ok, result = self._post_edit({
+            "prompt": inpaint_prompt,
+            "image_url": image_url,
+            "type": "inpaint"
+        })
+        if not ok:
+            return {"success": False, "error": result}
+        
+        operation = EditOperation(
+            type="inpaint",
+            parameters={
+                "mask_description": mask_description,
+                "replacement_prompt": replacement_prompt,
+                "original_url": image_url
+            },
+            description=f"Inpainted: {mask_description} → {replacement_prompt}",
+            confidence=0.85
+        )
+        
+        self.edit_history.append(operation)
+        
+        return {
+            "success": True,
+            "result_url": result,
+            "operation": operation
+        }
     
     def outpaint_image(self, image_url: str, expansion_direction: str, expansion_prompt: str) -> Dict[str, Any]:
         """Extend image beyond its original boundaries"""
@@ -174,300 +489,482 @@ class AdvancedImageEditor:
         # Create outpaint prompt
         outpaint_prompt = f"Extend the image to the {expansion_direction} with {expansion_prompt}, seamless continuation, natural extension"
         
-        try:
-            response = requests.post(
-                f"{self.api_base}/v1/image/generations",
-                json={
-                    "prompt": outpaint_prompt,
-                    "image_url": image_url,
-                    "type": "outpaint",
-                    "direction": expansion_direction
-                },
-                timeout=120
-            )
-            
-            if response.ok:
-                data = response.json()
-                result_url = data["data"][0]["url"]
-                
-                operation = EditOperation(
-                    type="outpaint",
-                    parameters={
-                        "direction": expansion_direction,
-                        "expansion_prompt": expansion_prompt,
-                        "original_url": image_url
-                    },
-                    description=f"Outpainted {expansion_direction}: {expansion_prompt}",
-                    confidence=0.80
-                )
-                
-                self.edit_history.append(operation)
-                
-                return {
-                    "success": True,
-                    "result_url": result_url,
-                    "operation": operation
-                }
-            else:
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        ok, result = self._post_edit({
+            "prompt": outpaint_prompt,
+            "image_url": image_url,
+            "type": "outpaint",
+            "direction": expansion_direction
+        })
+        if not ok:
+            return {"success": False, "error": result}
+        
+        operation = EditOperation(
+            type="outpaint",
+            parameters={
+                "direction": expansion_direction,
+                "expansion_prompt": expansion_prompt,
+                "original_url": image_url
+            },
+            description=f"Outpainted {expansion_direction}: {expansion_prompt}",
+            confidence=0.80
+        )
+        
+        self.edit_history.append(operation)
+        
+        return {
+            "success": True,
+            "result_url": result,
+            "operation": operation
+        }
     
-    def style_transfer(self, image_url: str, style_preset: str, custom_prompt: str = None) -> Dict[str, Any]:
-        """Apply artistic style to an image"""
+    def _style_transfer_request(self, style_preset: str, custom_prompt: str = None) -> Dict[str, Any]:
+        """Build the API payload and history record for a style transfer"""
         style_info = self.style_presets.get(style_preset)
         if not style_info:
             return {"success": False, "error": f"Unknown style preset: {style_preset}"}
         
         style_prompt = custom_prompt or style_info["prompt"]
-        console.print(f"[cyan]🎭 Style Transfer: {style_info['description']}[/cyan]")
         
-        try:
-            response = requests.post(
-                f"{self.api_base}/v1/image/generations",
-                json={
-                    "prompt": f"Transform this image {style_prompt}, maintain composition and subject",
-                    "image_url": image_url,
-                    "type": "style_transfer"
-                },
-                timeout=120
-            )
-            
-            if response.ok:
-                data = response.json()
-                result_url = data["data"][0]["url"]
-                
-                operation = EditOperation(
-                    type="style_transfer",
-                    parameters={
-                        "style_preset": style_preset,
-                        "style_prompt": style_prompt,
-                        "original_url": image_url
-                    },
-                    description=f"Style transfer: {style_info['description']}",
-                    confidence=0.90
-                )
-                
-                self.edit_history.append(operation)
-                
-                return {
-                    "success": True,
-                    "result_url": result_url,
-                    "operation": operation
-                }
-            else:
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        return {
+            "payload": {
+                "prompt": f"Transform this image {style_prompt}, maintain composition and subject",
+                "type": "style_transfer"
+            },
+            "type": "style_transfer",
+            "parameters": {
+                "style_preset": style_preset,
+                "style_prompt": style_prompt
+            },
+            "description": f"Style transfer: {style_info['description']}",
+            "confidence": 0.90
+        }
+    
+    def style_transfer(self, image_url: str, style_preset: str, custom_prompt: str = None) -> Dict[str, Any]:
+        """Apply artistic style to an image"""
+        request = self._style_transfer_request(style_preset, custom_prompt)
+        if "error" in request:
+            return request
+        
+        console.print(f"[cyan]🎭 Style Transfer: {self.style_presets[style_preset]['description']}[/cyan]")
+        
+        ok, result = self._post_edit({**request["payload"], "image_url": image_url})
+        if not ok:
+            return {"success": False, "error": result}
+        
+        return self._record_edit(request, image_url, result)
+    
+    def _color_adjustment_request(self, adjustment_type: str, intensity: float = 0.5) -> Dict[str, Any]:
+        """Build the API payload and history record for a color adjustment"""
+        template = _COLOR_ADJUSTMENT_PROMPTS.get(adjustment_type)
+        if template and "{" in template:
+            adjustment_prompt = template.format(percent=intensity * 100)
+        elif template:
+            # Static prompts are reused as-is so the interned string is shared
+            adjustment_prompt = template
+        else:
+            adjustment_prompt = f"apply {adjustment_type} adjustment"
+        
+        return {
+            "payload": {
+                "prompt": f"Adjust colors: {adjustment_prompt}",
+                "type": "color_adjustment"
+            },
+            "type": "color_adjust",
+            "parameters": {
+                "adjustment_type": adjustment_type,
+                "intensity": intensity
+            },
+            "description": f"Color adjustment: {adjustment_type}",
+            "confidence": 0.75
+        }
     
     def color_adjustment(self, image_url: str, adjustment_type: str, intensity: float = 0.5) -> Dict[str, Any]:
         """Adjust colors of an image"""
         console.print(f"[cyan]🎨 Color Adjustment: {adjustment_type} (intensity: {intensity})[/cyan]")
         
-        adjustment_prompts = {
-            "brightness": f"increase brightness by {intensity * 100:.0f}%",
-            "contrast": f"increase contrast by {intensity * 100:.0f}%",
-            "saturation": f"increase color saturation by {intensity * 100:.0f}%",
-            "warmth": f"add warm tones, golden hour lighting",
-            "coolness": f"add cool tones, blue hour lighting",
-            "vintage": f"apply vintage color grading, sepia tones",
-            "high_contrast": "apply high contrast, dramatic lighting",
-            "pastel": "apply pastel color palette, soft colors"
-        }
+        request = self._color_adjustment_request(adjustment_type, intensity)
         
-        adjustment_prompt = adjustment_prompts.get(adjustment_type, f"apply {adjustment_type} adjustment")
+        if adjustment_type in _LOCAL_COLOR_ADJUSTMENTS:
+            ok, result = self._apply_local_color_adjustment(image_url, adjustment_type, intensity)
+        else:
+            ok, result = self._post_edit({**request["payload"], "image_url": image_url})
+        if not ok:
+            return {"success": False, "error": result}
         
-        try:
-            response = requests.post(
-                f"{self.api_base}/v1/image/generations",
-                json={
-                    "prompt": f"Adjust colors: {adjustment_prompt}",
-                    "image_url": image_url,
-                    "type": "color_adjustment"
-                },
-                timeout=120
-            )
-            
-            if response.ok:
-                data = response.json()
-                result_url = data["data"][0]["url"]
-                
-                operation = EditOperation(
-                    type="color_adjust",
-                    parameters={
-                        "adjustment_type": adjustment_type,
-                        "intensity": intensity,
-                        "original_url": image_url
-                    },
-                    description=f"Color adjustment: {adjustment_type}",
-                    confidence=0.75
-                )
-                
-                self.edit_history.append(operation)
-                
-                return {
-                    "success": True,
-                    "result_url": result_url,
-                    "operation": operation
-                }
-            else:
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        return self._record_edit(request, image_url, result)
     
-    def apply_filter(self, image_url: str, filter_preset: str) -> Dict[str, Any]:
-        """Apply image filters"""
+    def _filter_request(self, filter_preset: str) -> Dict[str, Any]:
+        """Build the API payload and history record for an image filter"""
         filter_info = self.filter_presets.get(filter_preset)
         if not filter_info:
             return {"success": False, "error": f"Unknown filter preset: {filter_preset}"}
         
-        console.print(f"[cyan]🔧 Applying Filter: {filter_info['description']}[/cyan]")
+        filter_prompt = _FILTER_PROMPTS.get(filter_preset, f"apply {filter_preset} filter")
         
-        filter_prompts = {
-            "blur": "apply soft blur effect, dreamy atmosphere",
-            "sharpen": "enhance sharpness, crisp details",
-            "emboss": "apply embossed effect, raised appearance",
-            "edge_enhance": "enhance edges, define boundaries",
-            "smooth": "apply smoothing, soft appearance",
-            "contour": "apply contour effect, outlined appearance",
-            "detail": "enhance fine details, texture"
+        return {
+            "payload": {
+                "prompt": f"Apply filter: {filter_prompt}",
+                "type": "filter"
+            },
+            "type": "filter",
+            "parameters": {
+                "filter_preset": filter_preset
+            },
+            "description": f"Filter: {filter_info['description']}",
+            "confidence": 0.70
         }
+    
+    def apply_filter(self, image_url: str, filter_preset: str) -> Dict[str, Any]:
+        """Apply image filters"""
+        request = self._filter_request(filter_preset)
+        if "error" in request:
+            return request
         
-        filter_prompt = filter_prompts.get(filter_preset, f"apply {filter_preset} filter")
+        console.print(f"[cyan]🔧 Applying {request['description']}[/cyan]")
         
-        try:
-            response = requests.post(
-                f"{self.api_base}/v1/image/generations",
-                json={
-                    "prompt": f"Apply filter: {filter_prompt}",
-                    "image_url": image_url,
-                    "type": "filter"
-                },
-                timeout=120
-            )
+        if filter_preset in _LOCAL_FILTERS:
+            ok, result = self._apply_local_filter(image_url, _LOCAL_FILTERS[filter_preset])
+        else:
+            ok, result = self._post_edit({**request["payload"], "image_url": image_url})
+        if not ok:
+            return {"success": False, "error": result}
+        
+        return self._record_edit(request, image_url, result)
+    
+    def _load_image(self, image_url: str) -> Image.Image:
+        """Load an image from a URL or a base64 data URI"""
+        if image_url.startswith("data:"):
+            return Image.open(io.BytesIO(base64.b64decode(image_url.split(",", 1)[1])))
+        
+        return Image.open(io.BytesIO(self._fetch_image(image_url)))
+    
+    def _fetch_image(self, image_url: str) -> Union[bytes, memoryview]:
+        """Stream an image download into a single preallocated buffer, reusing small recent downloads"""
+        with self._source_cache_lock:
+            data = self._source_cache.get(image_url)
+            if data is not None:
+                self._source_cache.move_to_end(image_url)
+                return data
+        
+        with self.session.get(image_url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            content_length = int(response.headers.get("content-length", 0))
             
-            if response.ok:
-                data = response.json()
-                result_url = data["data"][0]["url"]
-                
-                operation = EditOperation(
-                    type="filter",
-                    parameters={
-                        "filter_preset": filter_preset,
-                        "original_url": image_url
-                    },
-                    description=f"Filter: {filter_info['description']}",
-                    confidence=0.70
-                )
-                
-                self.edit_history.append(operation)
-                
-                return {
-                    "success": True,
-                    "result_url": result_url,
-                    "operation": operation
-                }
+            if content_length and "content-encoding" not in response.headers:
+                # Size is known up front, so read straight into the final buffer
+                buffer = bytearray(content_length)
+                view = memoryview(buffer)
+                filled = 0
+                while filled < content_length:
+                    read = response.raw.readinto(view[filled:filled + DOWNLOAD_CHUNK_SIZE])
+                    if not read:
+                        break
+                    filled += read
+                data = view[:filled]
             else:
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
+                data = b"".join(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+        
+        # Repeated local edits of the same small source skip the download
+        if len(data) <= SOURCE_CACHE_MAX_BYTES:
+            with self._source_cache_lock:
+                self._source_cache[image_url] = data
+                if len(self._source_cache) > SOURCE_CACHE_MAX_ENTRIES:
+                    self._source_cache.popitem(last=False)
+        
+        return data
+    
+    def _encode_image(self, image: Image.Image) -> str:
+        """Encode an image as a base64 JPEG data URI"""
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=95)
+        return self._to_data_uri(buffer.getvalue())
+    
+    def _to_data_uri(self, data: bytes, content_type: str = "image/jpeg") -> str:
+        """Inline image bytes as a base64 data URI"""
+        return f"data:{content_type};base64," + base64.b64encode(data).decode("ascii")
+    
+    def _apply_local_filter(self, image_url: str, kernel: ImageFilter.Filter) -> Tuple[bool, str]:
+        """Apply a PIL filter in-process, returning (True, data_uri) or (False, error)"""
+        try:
+            image = self._load_image(image_url)
+            if image.mode not in ("L", "RGB"):
+                image = image.convert("RGB")
+            
+            return True, self._encode_image(image.filter(kernel))
+            
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            return False, str(e)
+    
+    def _apply_local_color_adjustment(self, image_url: str, adjustment_type: str, intensity: float) -> Tuple[bool, str]:
+        """Adjust colors in-process, returning (True, data_uri) or (False, error)"""
+        try:
+            pixels = np.asarray(self._load_image(image_url).convert("RGB"))
+            adjusted = _adjust_colors(pixels, adjustment_type, intensity)
+            return True, self._encode_image(Image.fromarray(adjusted, "RGB"))
+            
+        except Exception as e:
+            return False, str(e)
+    
+    def _batch_request(self, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolve a batch operation into its edit request"""
+        builder = self._request_dispatch.get(operation.get("type"))
+        if builder is None:
+            return {"success": False, "error": f"Unknown operation type: {operation.get('type')}"}
+        
+        return builder(operation)
+    
+    def _apply_one(self, image_url: str, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a single batch operation to an image"""
+        handler = self._op_dispatch.get(operation.get("type"))
+        if handler is None:
+            return {"success": False, "error": f"Unknown operation type: {operation.get('type')}"}
+        
+        return handler(image_url, operation)
+    
+    def _prepare_batch(self, operations: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[int], Optional[str]]:
+        """Validate batch operations in one pass, returning (steps, step index per operation, error)"""
+        # Consecutive duplicates of an idempotent step are collapsed into the first one
+        prepared = []
+        positions = []
+        previous_key = None
+        
+        for i, operation in enumerate(operations):
+            if operation.get("type") == "color_adjust" and not operation.get("adjustment_type"):
+                return [], [], f"Operation {i+1}: missing adjustment_type"
+            
+            request = self._batch_request(operation)
+            if "error" in request:
+                return [], [], f"Operation {i+1}: {request['error']}"
+            
+            # Re-applying the same style preset is a no-op, but filters and color adjustments compound
+            key = _dumps_sorted(operation) if operation.get("type") in IDEMPOTENT_OPERATIONS else None
+            if key is None or key != previous_key:
+                prepared.append(operation)
+            positions.append(len(prepared) - 1)
+            previous_key = key
+        
+        return prepared, positions, None
+    
+    @staticmethod
+    def _expand_results(results: List[Dict[str, Any]], positions: List[int]) -> List[Dict[str, Any]]:
+        """Line step results back up with the caller's operations, repeating the result of a collapsed step"""
+        return [results[step] for step in positions if step < len(results)]
     
     def batch_edit(self, image_url: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Apply multiple edits in sequence"""
+        operations, positions, error = self._prepare_batch(operations)
+        if error:
+            console.print(f"[red]❌ Invalid batch: {error}[/red]")
+            return {"success": False, "error": error, "results": [], "final_url": image_url}
+        
         console.print(f"[cyan]🔄 Batch Editing: {len(operations)} operations[/cyan]")
         
         results = []
+        success_count = 0
+        # Keep the remote URL for history and API steps; local steps load it through the source cache
         current_url = image_url
         
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-        ) as progress:
-            task = progress.add_task("Processing batch edits...", total=len(operations))
+        # A single step finishes before a spinner is useful, so skip the renderer entirely
+        if len(operations) > 1:
+            progress_context = Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                console=console,
+                transient=True,
+                refresh_per_second=4,
+            )
+        else:
+            progress_context = contextlib.nullcontext()
+        
+        with progress_context as progress:
+            if progress is not None:
+                task = progress.add_task("Processing batch edits...", total=len(operations))
             
             for i, operation in enumerate(operations):
-                progress.update(task, advance=1, description=f"Processing operation {i+1}/{len(operations)}")
-                
-                op_type = operation.get("type")
-                
-                if op_type == "style_transfer":
-                    result = self.style_transfer(
-                        current_url,
-                        operation.get("style_preset"),
-                        operation.get("custom_prompt")
-                    )
-                elif op_type == "color_adjust":
-                    result = self.color_adjustment(
-                        current_url,
-                        operation.get("adjustment_type"),
-                        operation.get("intensity", 0.5)
-                    )
-                elif op_type == "filter":
-                    result = self.apply_filter(
-                        current_url,
-                        operation.get("filter_preset")
-                    )
-                else:
-                    result = {"success": False, "error": f"Unknown operation type: {op_type}"}
+                if progress is not None:
+                    progress.update(task, advance=1, description=f"Processing operation {i+1}/{len(operations)}")
                 
+                result = self._apply_one(current_url, operation)
                 results.append(result)
                 
                 if result["success"]:
+                    success_count += 1
                     current_url = result["result_url"]
                 else:
                     console.print(f"[red]❌ Operation {i+1} failed: {result['error']}[/red]")
                     break
         
         return {
-            "success": len([r for r in results if r["success"]]) == len(operations),
+            "success": success_count == len(operations),
+            "results": self._expand_results(results, positions),
+            "final_url": current_url if results and results[-1]["success"] else image_url
+        }
+    
+    def batch_edit_parallel(self, image_url: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply independent edits to the same image concurrently"""
+        if not operations:
+            return {"success": True, "results": [], "result_urls": []}
+        
+        console.print(f"[cyan]⚡ Parallel Editing: {len(operations)} operations[/cyan]")
+        
+        results = [None] * len(operations)
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(operations))) as executor:
+            futures = {
+                executor.submit(self._apply_one, image_url, operation): i
+                for i, operation in enumerate(operations)
+            }
+            
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = {"success": False, "error": str(e)}
+                
+                if not results[i]["success"]:
+                    console.print(f"[red]❌ Operation {i+1} failed: {results[i]['error']}[/red]")
+        
+        return {
+            "success": all(r["success"] for r in results),
+            "results": results,
+            "result_urls": [r.get("result_url") for r in results]
+        }
+    
+    def _is_local_operation(self, operation: Dict[str, Any]) -> bool:
+        """Whether a batch operation is applied in-process rather than by the API"""
+        if operation.get("type") == "filter":
+            return operation.get("filter_preset") in _LOCAL_FILTERS
+        if operation.get("type") == "color_adjust":
+            return operation.get("adjustment_type") in _LOCAL_COLOR_ADJUSTMENTS
+        return False
+    
+    async def _apply_one_async(self, client: Optional["httpx.AsyncClient"], semaphore: asyncio.Semaphore,
+                               image_url: str, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a single batch operation without blocking the event loop"""
+        async with semaphore:
+            request = self._batch_request(operation)
+            if "error" in request:
+                return request
+            
+            # Local edits are CPU work; run them (and everything without httpx) on a worker thread
+            if client is None or self._is_local_operation(operation):
+                return await asyncio.get_running_loop().run_in_executor(None, self._apply_one, image_url, operation)
+            
+            ok, result = await self._post_edit_async(client, {**request["payload"], "image_url": image_url})
+            if not ok:
+                return {"success": False, "error": result}
+            
+            return self._record_edit(request, image_url, result)
+    
+    async def batch_edit_async(self, image_url: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply independent edits to the same image concurrently on the event loop"""
+        if not operations:
+            return {"success": True, "results": [], "result_urls": []}
+        
+        console.print(f"[cyan]⚡ Async Editing: {len(operations)} operations[/cyan]")
+        
+        semaphore = asyncio.Semaphore(ASYNC_BATCH_CONCURRENCY)
+        client = _create_async_client()
+        
+        try:
+            results = await asyncio.gather(*(
+                self._apply_one_async(client, semaphore, image_url, operation)
+                for operation in operations
+            ))
+        finally:
+            if client is not None:
+                await client.aclose()
+        
+        for i, result in enumerate(results):
+            if not result["success"]:
+                console.print(f"[red]❌ Operation {i+1} failed: {result['error']}[/red]")
+        
+        return {
+            "success": all(r["success"] for r in results),
             "results": results,
+            "result_urls": [r.get("result_url") for r in results]
+        }
+    
+    def batch_edit_remote(self, image_url: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply multiple edits in sequence with a single server round trip"""
+        if self._remote_batch_supported is False:
+            return self.batch_edit(image_url, operations)
+        
+        # Validate and collapse steps exactly as the local batch_edit does
+        operations, positions, error = self._prepare_batch(operations)
+        if error:
+            console.print(f"[red]❌ Invalid batch: {error}[/red]")
+            return {"success": False, "error": error, "results": [], "final_url": image_url}
+        
+        edit_requests = [self._batch_request(operation) for operation in operations]
+        
+        console.print(f"[cyan]🔄 Remote Batch Editing: {len(operations)} operations[/cyan]")
+        
+        try:
+            response = self.session.post(
+                f"{self.api_base}/v1/image/batch_edit",
+                data=_dumps_sorted({
+                    "image_url": image_url,
+                    "operations": [request["payload"] for request in edit_requests]
+                }),
+                headers={"Content-Type": "application/json"},
+                timeout=300
+            )
+        except Exception as e:
+            return {"success": False, "results": [{"success": False, "error": str(e)}], "final_url": image_url}
+        
+        if response.status_code in (404, 405):
+            # Older servers have no batch endpoint; remember and edit step by step
+            self._remote_batch_supported = False
+            return self.batch_edit(image_url, operations)
+        
+        if not response.ok:
+            error = f"HTTP {response.status_code}"
+            return {"success": False, "results": [{"success": False, "error": error}], "final_url": image_url}
+        
+        try:
+            steps = response.json().get("results", [])
+        except ValueError as e:
+            error = f"Invalid batch response: {e}"
+            return {"success": False, "results": [{"success": False, "error": error}], "final_url": image_url}
+        
+        self._remote_batch_supported = True
+        
+        results = []
+        success_count = 0
+        current_url = image_url
+        # zip stops at the requests we sent, even if the server returns extra results
+        for i, (request, step) in enumerate(zip(edit_requests, steps)):
+            if step.get("status") != "success":
+                result = {"success": False, "error": step.get("error", "Unknown error")}
+                results.append(result)
+                console.print(f"[red]❌ Operation {i+1} failed: {result['error']}[/red]")
+                break
+            
+            results.append(self._record_edit(request, current_url, step["url"]))
+            success_count += 1
+            current_url = step["url"]
+        
+        return {
+            "success": success_count == len(operations),
+            "results": self._expand_results(results, positions),
             "final_url": current_url if results and results[-1]["success"] else image_url
         }
     
     def get_edit_history(self) -> List[EditOperation]:
         """Get edit history"""
-        return self.edit_history
+        return list(self.edit_history)
     
     def display_style_presets(self):
         """Display available style presets"""
         console.print("\n[bold cyan]🎭 Available Style Presets[/bold cyan]")
-        
-        table = Table(show_header=True, header_style="bold magenta")
-        table.add_column("Style", style="cyan", width=15)
-        table.add_column("Description", style="green", width=40)
-        table.add_column("Prompt", style="yellow", width=50)
-        
-        for style_name, style_info in self.style_presets.items():
-            table.add_row(
-                style_name.replace("_", " ").title(),
-                style_info["description"],
-                style_info["prompt"][:50] + "..." if len(style_info["prompt"]) > 50 else style_info["prompt"]
-            )
-        
-        console.print(table)
+        console.print(_style_presets_table())
     
     def display_filter_presets(self):
         """Display available filter presets"""
         console.print("\n[bold cyan]🔧 Available Filter Presets[/bold cyan]")
-        
-        table = Table(show_header=True, header_style="bold magenta")
-        table.add_column("Filter", style="cyan", width=15)
-        table.add_column("Description", style="green", width=30)
-        table.add_column("Type", style="yellow", width=15)
-        
-        for filter_name, filter_info in self.filter_presets.items():
-            table.add_row(
-                filter_name.replace("_", " ").title(),
-                filter_info["description"],
-                filter_info["type"]
-            )
-        
-        console.print(table)
+        console.print(_filter_presets_table())
 
 def demo_advanced_editing():
     """Demo advanced image editing features"""
@@ -3,11 +3,21 @@
 Analytics dashboard for Nano Banana Image Generator
 """
 
+import base64
+import hashlib
 import json
+import math
+import mmap
+import os
+import re
+import string
 import time
+from collections import Counter
 from datetime import datetime, timedelta
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+import numpy as np
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -16,21 +26,241 @@ from rich.layout import Layout
 from rich.live import Live
 from rich.text import Text
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Number of entries shown in the recent activity table
+RECENT_ACTIVITY_LIMIT = 10
+
+# Display names for the output formats the generator produces
+_FMT_UPPER = {"jpg": "JPG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP", "gif": "GIF", "bmp": "BMP"}
+
+# Width of the bars in the time analysis table
+BAR_WIDTH = 20
+
+# Every possible bar, indexed by the number of filled cells
+_BARS = tuple("█" * filled + "░" * (BAR_WIDTH - filled) for filled in range(BAR_WIDTH + 1))
+
+# Timestamps collected before they are binned into hourly/daily buckets in one NumPy call
+TIMESTAMP_BATCH_SIZE = 65536
+
+# Number of pre-sorted most common words kept alongside the full word counts
+TOP_WORDS_LIMIT = 64
+
+# Layout version of the aggregates sidecar; a mismatch triggers a rebuild
+AGGREGATES_VERSION = 4
+
+# HyperLogLog precision: 2**12 one-byte registers, about 1.6% standard error
+HLL_PRECISION = 12
+
+# Files modified more recently than this many seconds are also hashed, since a rewrite within
+# the filesystem's mtime resolution would leave (size, mtime) unchanged
+FILE_KEY_HASH_WINDOW = 2.0
 
 console = Console()
 
+# Prompt words worth counting: runs of four or more ASCII letters
+_WORD_RE = re.compile(r"[a-z]{4,}")
+
+# ASCII case-folding table for prompts, applied in a single C-level pass
+_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Parser for a single JSON document held in bytes
+_loads = orjson.loads if orjson is not None else json.loads
+
+def _dumps(data: Any) -> bytes:
+    """Serialize data as indented JSON bytes with a trailing newline"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(data, indent=2) + "\n").encode('utf-8')
+
+def _load_json_file(path: Path) -> Any:
+    """Parse a JSON file, using orjson's single C-level pass when it is installed"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _iter_jsonl(path: Path) -> Iterator[Any]:
+    """Yield the records of a JSON Lines file in file order, reading it through mmap"""
+    if path.stat().st_size == 0:
+        return
+    
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for line in iter(mm.readline, b""):
+            if line.strip():
+                yield _loads(line)
+
+def _tail_jsonl(path: Path, n: int) -> List[Any]:
+    """Return the last n records of a JSON Lines file, newest first, without reading the prefix"""
+    if path.stat().st_size == 0:
+        return []
+    
+    records = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm)
+        while end > 0 and len(records) < n:
+            start = mm.rfind(b"\n", 0, end - 1) + 1
+            line = mm[start:end]
+            if line.strip():
+                records.append(_loads(line))
+            end = start
+    return records
+
+class HyperLogLog:
+    """Fixed-memory estimator of the number of distinct strings"""
+    
+    def __init__(self, p: int = HLL_PRECISION, registers: Optional[bytes] = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(self.registers)}")
+    
+    def add(self, value: str) -> None:
+        """Record a value"""
+        x = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = x >> (64 - self.p)
+        # Rank is the position of the first set bit in the remaining 64 - p bits
+        rank = (64 - self.p) - (x & ((1 << (64 - self.p)) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def __len__(self) -> int:
+        """Return the estimated number of distinct values recorded"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        
+        # Small-range correction: linear counting while empty registers remain
+        if estimate <= 2.5 * m:
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+def _new_aggregates() -> Dict[str, Any]:
+    """Return an empty set of rolling history aggregates"""
+    return {
+        "version": AGGREGATES_VERSION,
+        "last_offset": 0,
+        "n": 0,
+        "create": 0,
+        "edit": 0,
+        "total_len": 0,
+        "prompts": HyperLogLog(),
+        "words": Counter(),
+        "top_words": [],
+        "formats": Counter(),
+        "resolutions": Counter(),
+        "hourly": Counter(),
+        "daily": Counter()
+    }
+
+def _dump_aggregates(agg: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert aggregates into a JSON-serializable dict"""
+    data = dict(agg)
+    data["prompts"] = base64.b64encode(bytes(agg["prompts"].registers)).decode('ascii')
+    return data
+
+def _parse_aggregates(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild aggregates from their persisted form, starting over if they use an older layout"""
+    agg = _new_aggregates()
+    if data.get("version") != AGGREGATES_VERSION:
+        return agg
+    
+    for key in ("last_offset", "n", "create", "edit", "total_len"):
+        agg[key] = int(data.get(key, 0))
+    agg["prompts"] = HyperLogLog(registers=base64.b64decode(data["prompts"]))
+    for key in ("words", "formats", "resolutions", "hourly", "daily"):
+        agg[key] = Counter(data.get(key, {}))
+    agg["top_words"] = [tuple(entry) for entry in data.get("top_words", ())]
+    return agg
+
+def _bin_timestamps(stamps: List[str], hourly: Counter, daily: Counter) -> None:
+    """Add ISO timestamps to the hourly/daily counters, counting fixed-width slices with np.unique"""
+    if not stamps:
+        return
+    
+    # A 13-character prefix is "YYYY-MM-DDTHH"; numpy truncates longer strings to fit
+    prefix = np.array(stamps, dtype="U13")
+    days, day_counts = np.unique(prefix.astype("U10"), return_counts=True)
+    hours, hour_counts = np.unique(prefix.view("U1").reshape(-1, 13)[:, 11:13].copy().view("U2").ravel(), return_counts=True)
+    
+    daily.update(dict(zip(days.tolist(), day_counts.tolist())))
+    hourly.update(dict(zip(hours.tolist(), hour_counts.tolist())))
+
+def _load_jsonl_file(path: Path) -> List[Any]:
+    """Parse a whole JSON Lines history file into a newest-first list"""
+    records = list(_iter_jsonl(path))
+    records.reverse()
+    return records
+
 class AnalyticsDashboard:
     def __init__(self, api_base: str = "http://127.0.0.1:10000"):
         self.api_base = api_base
         self.stats_file = Path("generation_stats.json")
-        self.history_file = Path("generation_history.json")
+        self.history_file = Path("generation_history.jsonl")
+        # Newest-first JSON array written before the history moved to JSON Lines
+        self.legacy_history_file = Path("generation_history.json")
+        # Rolling aggregates over the JSONL history and the byte offset they cover
+        self.aggregates_file = Path("generation_history_aggregates.json")
+        self._aggregates = None
+        # path -> ((size, mtime_ns, digest), parsed data); reused until the file changes on disk
+        self._file_cache = {}
+        self._analysis_cache = None
+        # panel name -> (version, renderable); rebuilt only when the version changes
+        self._panel_cache = {}
+        # One kept-alive connection to the API server, reused by every refresh
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    
+    def _file_key(self, path: Path) -> Optional[Tuple[int, int, bytes]]:
+        """Return the (size, mtime_ns, digest) change key of a file, or None if it is missing"""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        
+        # A stat is enough for files that have settled; only a fresh write is hashed, because a
+        # rewrite within the mtime resolution keeps the same stat
+        if stat.st_size == 0 or time.time() - stat.st_mtime > FILE_KEY_HASH_WINDOW:
+            return (stat.st_size, stat.st_mtime_ns, b"")
+        
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return (stat.st_size, stat.st_mtime_ns, hashlib.blake2b(mm, digest_size=16).digest())
+        except (OSError, ValueError):
+            return None
+    
+    def _load_cached(self, path: Path, loader=_load_json_file) -> Any:
+        """Parse a file once and reuse the result while it is unchanged on disk"""
+        key = self._file_key(path)
+        cached = self._file_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        data = loader(path)
+        self._file_cache[path] = (key, data)
+        return data
     
     def load_stats(self) -> Dict[str, Any]:
         """Load generation statistics"""
         if self.stats_file.exists():
             try:
-                with open(self.stats_file, 'r') as f:
-                    return json.load(f)
+                return self._load_cached(self.stats_file)
             except Exception as e:
                 console.print(f"[yellow]Warning: Could not load stats: {e}[/yellow]")
         
@@ -41,102 +271,270 @@ class AnalyticsDashboard:
             "last_updated": None
         }
     
-    def load_history(self) -> List[Dict[str, Any]]:
-        """Load generation history"""
+    def save_stats(self, stats: Dict[str, Any]) -> bool:
+        """Save generation statistics"""
+        try:
+            with open(self.stats_file, 'wb') as f:
+                f.write(_dumps(stats))
+            return True
+        except (OSError, TypeError) as e:
+            console.print(f"[yellow]Warning: Could not save stats: {e}[/yellow]")
+            return False
+    
+    def _active_history_file(self) -> Path:
+        """Return the JSONL history, or the legacy JSON array if it has not been migrated yet"""
+        if self.history_file.exists() or not self.legacy_history_file.exists():
+            return self.history_file
+        return self.legacy_history_file
+    
+    def load_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Load generation history, newest first; with a limit only the most recent items are read"""
+        if limit is not None:
+            return self.tail_history(limit)
+        
         if self.history_file.exists():
             try:
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
+                return self._load_cached(self.history_file, _load_jsonl_file)
+            except Exception as e:
+                console.print(f"[yellow]Warning: Could not load history: {e}[/yellow]")
+        elif self.legacy_history_file.exists():
+            try:
+                return self._load_cached(self.legacy_history_file)
             except Exception as e:
                 console.print(f"[yellow]Warning: Could not load history: {e}[/yellow]")
         
         return []
     
+    def iter_history(self) -> Iterator[Dict[str, Any]]:
+        """Yield history items one at a time without materializing the whole history"""
+        path = self._active_history_file()
+        if not path.exists():
+            return
+        
+        try:
+            if path == self.history_file:
+                yield from _iter_jsonl(path)
+            elif ijson is not None:
+                with open(path, 'rb') as f:
+                    yield from ijson.items(f, 'item')
+            else:
+                yield from _load_json_file(path)
+        except Exception as e:
+            console.print(f"[yellow]Warning: Could not load history: {e}[/yellow]")
+    
+    def tail_history(self, n: int = RECENT_ACTIVITY_LIMIT) -> List[Dict[str, Any]]:
+        """Return the n most recent history items, newest first"""
+        path = self._active_history_file()
+        if not path.exists():
+            return []
+        
+        try:
+            if path == self.history_file:
+                return _tail_jsonl(path, n)
+            return list(islice(self.iter_history(), n))
+        except Exception as e:
+            console.print(f"[yellow]Warning: Could not load history: {e}[/yellow]")
+            return []
+    
     def get_server_stats(self) -> Dict[str, Any]:
         """Get current server statistics"""
         try:
-            response = requests.get(f"{self.api_base}/v1/stats", timeout=5)
+            response = self._session.get(f"{self.api_base}/v1/stats", timeout=5)
             if response.ok:
-                return response.json()
+                return _loads(response.content)
         except Exception:
             pass
         
         return {}
     
-    def analyze_prompts(self, history: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze prompt patterns"""
-        if not history:
-            return {"total_prompts": 0, "unique_prompts": 0, "common_words": []}
-        
-        # Count prompt types
-        create_count = len([h for h in history if h.get("type") == "create"])
-        edit_count = len([h for h in history if h.get("type") == "edit"])
+    def _fold_history(self, agg: Dict[str, Any], history: Iterable[Dict[str, Any]]) -> None:
+        """Fold history items into a set of aggregate counters in a single pass"""
+        total = 0
+        create_count = 0
+        edit_count = 0
+        total_length = 0
+        unique_prompts = agg["prompts"]
+        word_count = agg["words"]
+        format_count = agg["formats"]
+        resolution_count = agg["resolutions"]
+        hourly = agg["hourly"]
+        daily = agg["daily"]
+        stamps = []
         
-        # Analyze words in prompts
-        all_words = []
         for item in history:
-            words = item.get("prompt", "").lower().split()
-            all_words.extend(words)
-        
-        # Count word frequency
-        word_count = {}
-        for word in all_words:
-            if len(word) > 3:  # Ignore short words
-                word_count[word] = word_count.get(word, 0) + 1
+            total += 1
+            item_type = item.get("type")
+            prompt = item.get("prompt", "")
+            format_type = item.get("format", "jpg")
+            resolution = item.get("resolution", "1024x1024")
+            timestamp = item.get("timestamp")
+            
+            if item_type == "create":
+                create_count += 1
+            elif item_type == "edit":
+                edit_count += 1
+            
+            total_length += len(prompt)
+            unique_prompts.add(prompt)
+            
+            word_count.update(_WORD_RE.findall(prompt.translate(_LOWER)))
+            format_count[format_type] += 1
+            resolution_count[resolution] += 1
+            
+            # ISO timestamps: "YYYY-MM-DD" is [0:10] and the hour is [11:13]
+            if timestamp and len(timestamp) >= 13 and timestamp[10] in "T ":
+                stamps.append(timestamp)
+                if len(stamps) >= TIMESTAMP_BATCH_SIZE:
+                    _bin_timestamps(stamps, hourly, daily)
+                    stamps.clear()
+        
+        _bin_timestamps(stamps, hourly, daily)
+        agg["top_words"] = word_count.most_common(TOP_WORDS_LIMIT)
+        
+        agg["n"] += total
+        agg["create"] += create_count
+        agg["edit"] += edit_count
+        agg["total_len"] += total_length
+    
+    def _summarize(self, agg: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn aggregate counters into the prompt, format, resolution and time analyses"""
+        total = agg["n"]
         
-        # Get most common words
-        common_words = sorted(word_count.items(), key=lambda x: x[1], reverse=True)[:10]
+        # Get most common words, already sorted when the aggregates were folded
+        common_words = agg["top_words"][:10]
         
         return {
-            "total_prompts": len(history),
-            "create_count": create_count,
-            "edit_count": edit_count,
-            "unique_prompts": len(set(item.get("prompt", "") for item in history)),
-            "common_words": common_words,
-            "average_prompt_length": sum(len(item.get("prompt", "")) for item in history) / len(history) if history else 0
+            "prompts": {
+                "total_prompts": total,
+                "create_count": agg["create"],
+                "edit_count": agg["edit"],
+                "unique_prompts": len(agg["prompts"]),
+                "common_words": common_words,
+                "average_prompt_length": agg["total_len"] / total if total else 0
+            },
+            "formats": agg["formats"],
+            "resolutions": agg["resolutions"],
+            "time": {"hourly": agg["hourly"], "daily": agg["daily"]}
         }
     
+    def _analyze_all(self, history: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Compute prompt, format, resolution and time analyses in a single pass"""
+        agg = _new_aggregates()
+        self._fold_history(agg, history)
+        return self._summarize(agg)
+    
+    def analyze_prompts(self, history: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyze prompt patterns"""
+        return self._analyze_all(history)["prompts"]
+    
     def analyze_formats(self, history: List[Dict[str, Any]]) -> Dict[str, int]:
         """Analyze format usage"""
-        format_count = {}
-        for item in history:
-            format_type = item.get("format", "jpg")
-            format_count[format_type] = format_count.get(format_type, 0) + 1
-        
-        return format_count
+        return self._analyze_all(history)["formats"]
     
     def analyze_resolutions(self, history: List[Dict[str, Any]]) -> Dict[str, int]:
         """Analyze resolution usage"""
-        resolution_count = {}
-        for item in history:
-            resolution = item.get("resolution", "1024x1024")
-            resolution_count[resolution] = resolution_count.get(resolution, 0) + 1
-        
-        return resolution_count
+        return self._analyze_all(history)["resolutions"]
     
     def get_time_analysis(self, history: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze generation patterns over time"""
-        if not history:
-            return {"hourly": {}, "daily": {}}
+        return self._analyze_all(history)["time"]
+    
+    def _read_aggregates(self) -> Dict[str, Any]:
+        """Load the persisted aggregates sidecar, or start empty if it is missing or unreadable"""
+        if self.aggregates_file.exists():
+            try:
+                return _parse_aggregates(_load_json_file(self.aggregates_file))
+            except Exception as e:
+                console.print(f"[yellow]Warning: Could not load aggregates, rebuilding: {e}[/yellow]")
+        
+        return _new_aggregates()
+    
+    def _write_aggregates(self, agg: Dict[str, Any]) -> None:
+        """Persist the aggregates sidecar atomically, so readers never see a half-written file"""
+        tmp_file = self.aggregates_file.with_name(self.aggregates_file.name + ".tmp")
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(_dump_aggregates(agg), f)
+            os.replace(tmp_file, self.aggregates_file)
+        except OSError as e:
+            console.print(f"[yellow]Warning: Could not save aggregates: {e}[/yellow]")
+    
+    def update_aggregates(self) -> Dict[str, Any]:
+        """Fold the history lines appended since the last refresh into the rolling aggregates"""
+        agg = self._aggregates if self._aggregates is not None else self._read_aggregates()
         
-        # Group by hour and day
-        hourly = {}
-        daily = {}
+        try:
+            size = self.history_file.stat().st_size
+        except OSError:
+            size = 0
         
-        for item in history:
-            timestamp = item.get("timestamp")
-            if timestamp:
-                try:
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    hour = dt.hour
-                    day = dt.strftime("%Y-%m-%d")
-                    
-                    hourly[hour] = hourly.get(hour, 0) + 1
-                    daily[day] = daily.get(day, 0) + 1
-                except:
-                    continue
-        
-        return {"hourly": hourly, "daily": daily}
+        # A shorter file means the log was truncated or replaced: start over
+        if size < agg["last_offset"]:
+            agg = _new_aggregates()
+        
+        if size > agg["last_offset"]:
+            offset = agg["last_offset"]
+            
+            def new_items():
+                nonlocal offset
+                with open(self.history_file, 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        # Stop at a partially written last line; it is folded in next time
+                        if not line.endswith(b"\n"):
+                            break
+                        offset += len(line)
+                        if line.strip():
+                            yield _loads(line)
+            
+            try:
+                self._fold_history(agg, new_items())
+            except Exception as e:
+                console.print(f"[yellow]Warning: Could not load history: {e}[/yellow]")
+                agg = _new_aggregates()
+            else:
+                agg["last_offset"] = offset
+                self._write_aggregates(agg)
+        
+        self._aggregates = agg
+        return agg
+    
+    def _analyze_history(self) -> Dict[str, Any]:
+        """Analyze the history, folding in only new JSONL records or reusing the last legacy result"""
+        path = self._active_history_file()
+        if path == self.history_file:
+            agg = self.update_aggregates()
+            # Keyed on the log offset: the analysis only changes when new records were folded in
+            key = ("offset", agg["last_offset"])
+            if self._analysis_cache is None or self._analysis_cache[0] != key:
+                self._analysis_cache = (key, self._summarize(agg))
+            return self._analysis_cache[1]
+        
+        key = self._file_key(path)
+        if key is not None and self._analysis_cache is not None and self._analysis_cache[0] == key:
+            return self._analysis_cache[1]
+        
+        analysis = self._analyze_all(self.iter_history())
+        
+        if key is not None:
+            self._analysis_cache = (key, analysis)
+        return analysis
+    
+    def _analysis_version(self, analysis: Dict[str, Any]) -> Any:
+        """Return the cache key the given analysis was computed for, or None if it is not cached"""
+        if self._analysis_cache is not None and self._analysis_cache[1] is analysis:
+            return self._analysis_cache[0]
+        return None
+    
+    def _cached_panel(self, name: str, version: Any, build) -> Any:
+        """Return the cached renderable for a panel, calling build only when its version changed"""
+        cached = self._panel_cache.get(name)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+        
+        panel = build()
+        self._panel_cache[name] = (version, panel)
+        return panel
     
     def create_summary_panel(self, stats: Dict[str, Any], server_stats: Dict[str, Any]) -> Panel:
         """Create summary statistics panel"""
@@ -180,31 +578,27 @@ Avg Length: [bold]{prompt_analysis['average_prompt_length']:.0f} chars[/bold]
 [bold]Most Common Words:[/bold]
         """
         
-        for word, count in prompt_analysis['common_words'][:5]:
-            content += f"\n• {word}: {count}"
+        parts = [content]
+        parts.extend(f"\n• {word}: {count}" for word, count in prompt_analysis['common_words'][:5])
         
-        return Panel(content.strip(), title="Prompts", border_style="cyan")
+        return Panel("".join(parts).strip(), title="Prompts", border_style="cyan")
     
     def create_format_analysis_panel(self, format_analysis: Dict[str, int], resolution_analysis: Dict[str, int]) -> Panel:
         """Create format and resolution analysis panel"""
-        content = "[bold magenta]🖼️ Format & Resolution Analysis[/bold magenta]\n\n"
+        parts = ["[bold magenta]🖼️ Format & Resolution Analysis[/bold magenta]\n\n[bold]Formats:[/bold]\n"]
+        parts.extend(f"• {format_type.upper()}: {count}\n" for format_type, count in sorted(format_analysis.items(), key=lambda x: x[1], reverse=True))
         
-        content += "[bold]Formats:[/bold]\n"
-        for format_type, count in sorted(format_analysis.items(), key=lambda x: x[1], reverse=True):
-            content += f"• {format_type.upper()}: {count}\n"
+        parts.append("\n[bold]Resolutions:[/bold]\n")
+        parts.extend(f"• {resolution}: {count}\n" for resolution, count in sorted(resolution_analysis.items(), key=lambda x: x[1], reverse=True))
         
-        content += "\n[bold]Resolutions:[/bold]\n"
-        for resolution, count in sorted(resolution_analysis.items(), key=lambda x: x[1], reverse=True):
-            content += f"• {resolution}: {count}\n"
-        
-        return Panel(content.strip(), title="Formats & Resolutions", border_style="magenta")
+        return Panel("".join(parts).strip(), title="Formats & Resolutions", border_style="magenta")
     
     def create_time_analysis_table(self, time_analysis: Dict[str, Any]) -> Table:
         """Create time analysis table"""
         table = Table(show_header=True, header_style="bold green")
         table.add_column("Time", style="cyan", width=15)
         table.add_column("Count", style="yellow", width=10)
-        table.add_column("Visual", style="green", width=20)
+        table.add_column("Visual", style="green", width=BAR_WIDTH)
         
         # Show hourly data
         hourly = time_analysis.get("hourly", {})
@@ -213,11 +607,10 @@ Avg Length: [bold]{prompt_analysis['average_prompt_length']:.0f} chars[/bold]
             
             for hour in sorted(hourly.keys()):
                 count = hourly[hour]
-                bar_length = int((count / max_count) * 20)
-                bar = "█" * bar_length + "░" * (20 - bar_length)
+                bar = _BARS[min(BAR_WIDTH, int(count * BAR_WIDTH / max_count))]
                 
                 table.add_row(
-                    f"{hour:02d}:00",
+                    f"{hour}:00",
                     str(count),
                     f"[green]{bar}[/green]"
                 )
@@ -234,54 +627,63 @@ Avg Length: [bold]{prompt_analysis['average_prompt_length']:.0f} chars[/bold]
         table.add_column("Status", style="red", width=8)
         
         # Show last 10 entries
-        recent = history[:10]
+        recent = history[:RECENT_ACTIVITY_LIMIT]
         
         for item in recent:
             timestamp = item.get("timestamp", "")
             try:
                 dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
                 time_str = dt.strftime("%m/%d %H:%M")
-            except:
+            except (AttributeError, ValueError):
                 time_str = "Unknown"
             
             item_type = item.get("type", "unknown")
-            prompt = item.get("prompt", "")[:40] + "..." if len(item.get("prompt", "")) > 40 else item.get("prompt", "")
-            format_type = item.get("format", "jpg").upper()
-            status = "✅" if item.get("url") else "❌"
+            prompt = item.get("prompt", "")
+            if len(prompt) > 40:
+                prompt = f"{prompt[:40]}..."
+            format_type = item.get("format", "jpg")
+            format_type = _FMT_UPPER.get(format_type) or str(format_type).upper()
+            # History items record their result under "image_url"
+            status = "✅" if item.get("image_url") or item.get("url") else "❌"
             
             table.add_row(time_str, item_type, prompt, format_type, status)
         
         return table
     
-    def display_dashboard(self):
-        """Display the complete analytics dashboard"""
+    def _build_renderable(self) -> Layout:
+        """Load, analyze and lay out the complete dashboard without printing it"""
         # Load data
         stats = self.load_stats()
-        history = self.load_history()
         server_stats = self.get_server_stats()
         
         # Analyze data
-        prompt_analysis = self.analyze_prompts(history)
-        format_analysis = self.analyze_formats(history)
-        resolution_analysis = self.analyze_resolutions(history)
-        time_analysis = self.get_time_analysis(history)
+        analysis = self._analyze_history()
+        prompt_analysis = analysis["prompts"]
+        format_analysis = analysis["formats"]
+        resolution_analysis = analysis["resolutions"]
+        time_analysis = analysis["time"]
         
-        # Clear screen and show banner
-        console.clear()
         banner = Panel(
             "[bold blue]🍌 Nano Banana Analytics Dashboard[/bold blue]\n\n"
             "Real-time generation analytics and insights",
             title="Analytics",
             border_style="blue"
         )
-        console.print(banner)
+        
+        footer = Panel(
+            f"[bold]Last Updated:[/bold] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | "
+            f"[bold]Total History Items:[/bold] {prompt_analysis['total_prompts']} | "
+            f"[bold]Press Ctrl+C to exit[/bold]",
+            border_style="blue"
+        )
         
         # Create layout
         layout = Layout()
         layout.split_column(
+            Layout(banner, name="banner", size=5),
             Layout(name="top", size=3),
-            Layout(name="middle", size=15),
-            Layout(name="bottom")
+            Layout(name="middle"),
+            Layout(footer, name="footer", size=3)
         )
         
         layout["middle"].split_row(
@@ -299,32 +701,35 @@ Avg Length: [bold]{prompt_analysis['average_prompt_length']:.0f} chars[/bold]
             Layout(name="time", size=10)
         )
         
-        # Populate layout
-        layout["top"].update(self.create_recent_activity_table(history))
-        layout["summary"].update(self.create_summary_panel(stats, server_stats))
-        layout["prompts"].update(self.create_prompt_analysis_panel(prompt_analysis))
-        layout["formats"].update(self.create_format_analysis_panel(format_analysis, resolution_analysis))
-        layout["time"].update(self.create_time_analysis_table(time_analysis))
+        # Populate layout; only the recent activity table is rebuilt on every refresh
+        analysis_version = self._analysis_version(analysis)
+        # The summary shows uptime in minutes, so it changes at most once a minute
+        summary_version = (self._file_key(self.stats_file), server_stats.get("server_uptime"), int(time.time()) // 60)
         
-        # Display layout
-        console.print(layout)
+        layout["top"].update(self.create_recent_activity_table(self.tail_history()))
+        layout["summary"].update(self._cached_panel("summary", summary_version, lambda: self.create_summary_panel(stats, server_stats)))
+        layout["prompts"].update(self._cached_panel("prompts", analysis_version, lambda: self.create_prompt_analysis_panel(prompt_analysis)))
+        layout["formats"].update(self._cached_panel("formats", analysis_version, lambda: self.create_format_analysis_panel(format_analysis, resolution_analysis)))
+        layout["time"].update(self._cached_panel("time", analysis_version, lambda: self.create_time_analysis_table(time_analysis)))
         
-        # Show footer
-        footer = Panel(
-            f"[bold]Last Updated:[/bold] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | "
-            f"[bold]Total History Items:[/bold] {len(history)} | "
-            f"[bold]Press Ctrl+C to exit[/bold]",
-            border_style="blue"
-        )
-        console.print(footer)
+        return layout
+    
+    def display_dashboard(self):
+        """Display the complete analytics dashboard"""
+        renderable = self._build_renderable()
+        
+        # Buffer the clear and the render so the terminal receives them in one write
+        with console:
+            console.clear()
+            console.print(renderable)
     
     def run_live_dashboard(self, refresh_interval: int = 30):
         """Run live dashboard with auto-refresh"""
         try:
-            with Live(self.display_dashboard, refresh_per_second=1, screen=True) as live:
+            with Live(self._build_renderable(), console=console, refresh_per_second=1, screen=True) as live:
                 while True:
                     time.sleep(refresh_interval)
-                    live.update(self.display_dashboard())
+                    live.update(self._build_renderable())
         except KeyboardInterrupt:
             console.print("\n[yellow]Dashboard stopped[/yellow]")
 
@@ -4,22 +4,164 @@ Webhook support and external API integrations for Nano Banana Image Generator
 """
 
 import json
+import atexit
+import logging
+import os
+import sys
+import tempfile
+import itertools
 import time
+import functools
 import hashlib
 import hmac
-from typing import Dict, List, Any, Optional, Callable
+import uuid
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Awaitable, BinaryIO, Mapping, Callable, Iterable, Iterator, Tuple, Union
 from dataclasses import dataclass
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import asyncio
+import threading
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 console = Console()
+# Per-dispatch messages go through logging; rich output is kept for one-shot summaries
+logger = logging.getLogger("nano_banana.webhooks")
+
+# dataclass(slots=True) needs Python 3.10; older interpreters get regular dataclasses
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Seconds allowed to open a connection to a webhook or integration endpoint
+CONNECT_TIMEOUT = 3.0
+
+# Seconds allowed between bytes of an endpoint's response
+READ_TIMEOUT = 7.0
+
+# Most recent webhook events kept in a manager's event history
+WEBHOOK_HISTORY_LIMIT = 10000
+
+# Webhook events waiting for the background worker; the oldest is dropped when full
+WEBHOOK_QUEUE_SIZE = 1024
+
+# Downloaded images kept so one image can be uploaded to several services: entries, total bytes, seconds
+IMAGE_CACHE_SIZE = 64
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+IMAGE_CACHE_TTL = 60.0
+
+# Read size used when streaming image downloads into uploads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Longest pause, in seconds, before a failing webhook is tried again
+WEBHOOK_MAX_COOLDOWN = 600
+
+# Header carrying the hex HMAC-SHA256 of a signed webhook body
+SIGNATURE_HEADER = "X-Signature-SHA256"
+
+# Distinct (service, credentials) pairs whose formatted URL and headers are kept per integrations manager
+REQUEST_CACHE_SIZE = 256
+
+# Seconds a partial webhook batch may wait before it is sent anyway
+WEBHOOK_FLUSH_INTERVAL = 5.0
+
+# Seconds the exit hook waits for the background worker to send queued webhook events
+WEBHOOK_EXIT_TIMEOUT = 10.0
+
+def _dumps_sorted(payload: Dict[str, Any]) -> bytes:
+    """Serialize a payload to canonical (key-sorted) JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    """Serialize a request body to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+def _dumps_header(payload: Dict[str, Any]) -> str:
+    """Serialize a payload for an HTTP header value, which must stay ASCII"""
+    if orjson is not None:
+        value = orjson.dumps(payload).decode()
+        if value.isascii():
+            return value
+    return json.dumps(payload)
+
+class _StreamedBody:
+    """Request body that is streamed chunk by chunk but still advertises its total length"""
+    
+    def __init__(self, chunks: Iterable[bytes], length: int):
+        self._chunks = chunks
+        self._length = length
+    
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._chunks)
+    
+    def __len__(self) -> int:
+        return self._length
+
+def _image_chunks(image_data: Union[bytes, BinaryIO]) -> Tuple[Iterable[bytes], int]:
+    """Body chunks and total length of a fetched image; spooled files are read DOWNLOAD_CHUNK_SIZE at a time"""
+    if isinstance(image_data, bytes):
+        return (image_data,), len(image_data)
+    return iter(functools.partial(image_data.read, DOWNLOAD_CHUNK_SIZE), b""), os.fstat(image_data.fileno()).st_size
+
+def _release_image(image_data: Union[bytes, BinaryIO, None]):
+    """Close a spooled download; cached bytes need no cleanup"""
+    if image_data is not None and not isinstance(image_data, bytes):
+        image_data.close()
+
+def _create_session() -> requests.Session:
+    """Create a pooled HTTP session so repeated calls to the same host reuse their TCP/TLS connection"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=64,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _create_async_client() -> Optional["httpx.AsyncClient"]:
+    """Create an async client for concurrent fan-out, preferring HTTP/2 when h2 is installed"""
+    if httpx is None:
+        return None
+    
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    try:
+        return httpx.AsyncClient(http2=True, limits=limits, timeout=30.0)
+    except ImportError:
+        return httpx.AsyncClient(limits=limits, timeout=30.0)
 
-@dataclass
+def _run_coroutine(coro):
+    """Run a coroutine to completion from synchronous code, even inside a running event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    # A loop is already running on this thread; give the coroutine its own loop on a worker
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class WebhookEvent:
     """Data class for webhook events"""
     event_type: str
@@ -28,26 +170,57 @@ class WebhookEvent:
     signature: Optional[str] = None
     source: str = "nano_banana"
 
-@dataclass
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class APIEndpoint:
     """Data class for external API endpoints"""
     name: str
     url: str
     method: str
-    headers: Dict[str, str]
+    headers: Tuple[Tuple[str, str], ...]
     auth_type: str
     description: str
+    
+    def __post_init__(self):
+        # Header templates are shared by every request, so keep them as immutable (name, value) pairs
+        if isinstance(self.headers, Mapping):
+            object.__setattr__(self, "headers", tuple(self.headers.items()))
 
 class WebhookManager:
     """Webhook management system"""
     
-    def __init__(self):
+    def __init__(self, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 batch_size: int = 1, flush_interval: float = WEBHOOK_FLUSH_INTERVAL,
+                 history_limit: int = WEBHOOK_HISTORY_LIMIT, queue_size: int = WEBHOOK_QUEUE_SIZE):
         self.webhooks = {}
-        self.event_history = []
+        self.event_history = deque(maxlen=history_limit)
+        # Lifetime event totals, kept up to date so stats never rescan the history
+        self._event_counts = Counter()
+        self._events_total = 0
         self.secret_keys = {}
+        # webhook_id -> HMAC keyed with its secret; copied per signature to skip the key schedule
+        self._hmac_proto = {}
+        # event type -> subscribed webhook ids (a dict keeps registration order), plus active ids
+        self._by_event = defaultdict(dict)
+        self._active = set()
+        self.session = _create_session()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # With batch_size > 1, events are queued per webhook and sent as {"events": [...]}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queues = defaultdict(lambda: deque(maxlen=self.batch_size * 4))
+        self._queued_since = {}
+        self._queues_lock = threading.Lock()
+        # send_webhook hands events to a background worker so callers never wait on the network
+        self._pending = deque(maxlen=queue_size)
+        self._pending_ready = threading.Condition()
+        self._in_flight = 0
+        self._dropped_events = 0
+        self._worker = None
     
     def register_webhook(self, webhook_id: str, url: str, events: List[str], secret: str = None):
         """Register a new webhook endpoint"""
+        self._unindex_webhook(webhook_id)
         self.webhooks[webhook_id] = {
             "url": url,
             "events": events,
@@ -55,22 +228,52 @@ class WebhookManager:
             "active": True,
             "created": datetime.now().isoformat(),
             "last_used": None,
-            "failure_count": 0
+            "failures": 0,
+            # time.monotonic() before which the webhook is skipped after failing
+            "cooldown_until": 0.0
         }
         
         if secret:
             self.secret_keys[webhook_id] = secret
+            self._hmac_proto[webhook_id] = hmac.new(secret.encode(), None, hashlib.sha256)
+        else:
+            # Re-registering without a secret must stop signing with the old one
+            self.secret_keys.pop(webhook_id, None)
+            self._hmac_proto.pop(webhook_id, None)
+        
+        for event_type in events:
+            self._by_event[event_type][webhook_id] = None
+        self._active.add(webhook_id)
         
         console.print(f"[green]✅ Registered webhook: {webhook_id}[/green]")
     
     def unregister_webhook(self, webhook_id: str):
         """Unregister a webhook"""
         if webhook_id in self.webhooks:
+            self._unindex_webhook(webhook_id)
             del self.webhooks[webhook_id]
+            with self._queues_lock:
+                self._queues.pop(webhook_id, None)
+            self.secret_keys.pop(webhook_id, None)
+            self._hmac_proto.pop(webhook_id, None)
             console.print(f"[yellow]🗑️ Unregistered webhook: {webhook_id}[/yellow]")
     
-    def send_webhook(self, event_type: str, data: Dict[str, Any]):
-        """Send webhook event to registered endpoints"""
+    def _unindex_webhook(self, webhook_id: str):
+        """Remove a webhook from the event subscription index"""
+        webhook_info = self.webhooks.get(webhook_id)
+        if webhook_info is None:
+            return
+        
+        for event_type in webhook_info["events"]:
+            subscribers = self._by_event.get(event_type)
+            if subscribers is not None:
+                subscribers.pop(webhook_id, None)
+                if not subscribers:
+                    del self._by_event[event_type]
+        self._active.discard(webhook_id)
+    
+    def _prepare_event(self, event_type: str, data: Dict[str, Any]) -> Tuple[WebhookEvent, List[Tuple[str, Dict[str, Any]]]]:
+        """Record a webhook event and find the endpoints subscribed to it"""
         event = WebhookEvent(
             event_type=event_type,
             timestamp=datetime.now().isoformat(),
@@ -78,105 +281,347 @@ class WebhookManager:
         )
         
         self.event_history.append(event)
+        self._event_counts[event_type] += 1
+        self._events_total += 1
         
-        # Find webhooks that listen to this event type
+        # Find active webhooks that listen to this event type. Unbatched sends skip a cooling-down
+        # webhook; batched events are still queued for it and go out once _drain_queues retries it
+        now = time.monotonic()
         target_webhooks = [
-            (webhook_id, webhook_info) 
-            for webhook_id, webhook_info in self.webhooks.items()
-            if webhook_info["active"] and event_type in webhook_info["events"]
+            (webhook_id, self.webhooks[webhook_id])
+            for webhook_id in self._by_event.get(event_type, ())
+            if webhook_id in self._active and (self.batch_size > 1 or self.webhooks[webhook_id]["cooldown_until"] <= now)
         ]
         
         if not target_webhooks:
-            console.print(f"[yellow]⚠️ No webhooks registered for event: {event_type}[/yellow]")
-            return
+            logger.debug("No webhooks registered for event: %s", event_type)
+        else:
+            logger.debug("Sending webhook event '%s' to %d endpoints", event_type, len(target_webhooks))
         
-        console.print(f"[cyan]📡 Sending webhook event '{event_type}' to {len(target_webhooks)} endpoints[/cyan]")
+        return event, target_webhooks
+    
+    def _encode_payload(self, webhook_id: str, payload: Union[Dict[str, Any], List[bytes]]) -> Tuple[bytes, Dict[str, str]]:
+        """Serialize a payload (or take pre-encoded body parts) and sign exactly those bytes when the webhook has a secret"""
+        parts = payload if isinstance(payload, list) else [_dumps_sorted(payload)]
+        headers = {"Content-Type": "application/json"}
         
-        for webhook_id, webhook_info in target_webhooks:
-            try:
-                # Prepare payload
-                payload = {
-                    "event_type": event_type,
-                    "timestamp": event.timestamp,
-                    "data": data,
-                    "source": "nano_banana"
-                }
+        if webhook_id in self._hmac_proto:
+            # One copy of the keyed HMAC absorbs the parts in order, so a batch is signed in a single pass
+            signer = self._hmac_proto[webhook_id].copy()
+            for part in parts:
+                signer.update(part)
+            headers[SIGNATURE_HEADER] = signer.hexdigest()
+        
+        return b"".join(parts), headers
+    
+    def _build_payload(self, event: WebhookEvent) -> Dict[str, Any]:
+        """Build the JSON payload for one event"""
+        return {
+            "event_type": event.event_type,
+            "timestamp": event.timestamp,
+            "data": event.data,
+            "source": "nano_banana"
+        }
+    
+    def _encode_batch_entry(self, event: WebhookEvent) -> bytes:
+        """Serialize one event for a batch; done once however many webhooks queue it"""
+        return _dumps_sorted({"event_type": event.event_type, "timestamp": event.timestamp, "data": event.data})
+    
+    def _build_batch_payload(self, entries: List[bytes]) -> List[bytes]:
+        """Frame encoded events as the parts of one canonical {"events": [...], "source": ...} body"""
+        parts = [b'{"events":[']
+        for i, entry in enumerate(entries):
+            if i:
+                parts.append(b",")
+            parts.append(entry)
+        parts.append(b'],"source":"nano_banana"}')
+        return parts
+    
+    def _record_response(self, webhook_id: str, webhook_info: Dict[str, Any], status_code: int) -> bool:
+        """Update a webhook's health after it answered a delivery"""
+        if status_code < 400:
+            logger.info("Webhook sent to %s", webhook_id)
+            webhook_info["last_used"] = datetime.now().isoformat()
+            webhook_info["failures"] = 0
+            webhook_info["cooldown_until"] = 0.0
+            return True
+        
+        logger.warning("Webhook failed to %s: %s", webhook_id, status_code)
+        return self._record_failure(webhook_id, webhook_info)
+    
+    def _record_error(self, webhook_id: str, webhook_info: Dict[str, Any], error: Exception) -> bool:
+        """Update a webhook's health after a delivery could not be made"""
+        logger.warning("Webhook error to %s: %s", webhook_id, error)
+        return self._record_failure(webhook_id, webhook_info)
+    
+    def _record_failure(self, webhook_id: str, webhook_info: Dict[str, Any]) -> bool:
+        """Back a failing webhook off exponentially instead of disabling it for good"""
+        webhook_info["failures"] += 1
+        cooldown = min(2 ** webhook_info["failures"], WEBHOOK_MAX_COOLDOWN)
+        webhook_info["cooldown_until"] = time.monotonic() + cooldown
+        logger.warning("Pausing webhook %s for %ss after %d failures", webhook_id, cooldown, webhook_info["failures"])
+        return False
+    
+    def _deliver(self, webhook_id: str, webhook_info: Dict[str, Any], payload: Union[Dict[str, Any], List[bytes]]) -> bool:
+        """Deliver a payload to one endpoint over the shared session"""
+        try:
+            body, headers = self._encode_payload(webhook_id, payload)
+            response = self.session.post(
+                webhook_info["url"],
+                data=body,
+                headers=headers,
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
+        except Exception as e:
+            return self._record_error(webhook_id, webhook_info, e)
+        
+        return self._record_response(webhook_id, webhook_info, response.status_code)
+    
+    async def _deliver_async(self, client: Optional["httpx.AsyncClient"], webhook_id: str,
+                             webhook_info: Dict[str, Any], payload: Union[Dict[str, Any], List[bytes]]) -> bool:
+        """Deliver a payload to one endpoint without blocking the event loop"""
+        # Without httpx, fall back to the pooled requests session on a worker thread
+        if client is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._deliver, webhook_id, webhook_info, payload
+            )
+        
+        try:
+            body, headers = self._encode_payload(webhook_id, payload)
+            response = await client.post(
+                webhook_info["url"],
+                content=body,
+                headers=headers,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            )
+        except Exception as e:
+            return self._record_error(webhook_id, webhook_info, e)
+        
+        return self._record_response(webhook_id, webhook_info, response.status_code)
+    
+    async def _deliver_all(self, client: Optional["httpx.AsyncClient"],
+                           deliveries: List[Tuple[str, Dict[str, Any], List[bytes]]]) -> List[bool]:
+        """Deliver (webhook_id, webhook_info, payload) triples concurrently over a shared client"""
+        if not deliveries:
+            return []
+        
+        outcomes = await asyncio.gather(*(
+            self._deliver_async(client, webhook_id, webhook_info, payload)
+            for webhook_id, webhook_info, payload in deliveries
+        ), return_exceptions=True)
+        
+        return [outcome is True for outcome in outcomes]
+    
+    def _drain_queues(self, force: bool = False) -> List[Tuple[str, Dict[str, Any], List[bytes]]]:
+        """Turn queued events into batch deliveries for every webhook that is due to flush"""
+        now = time.monotonic()
+        deliveries = []
+        
+        with self._queues_lock:
+            for webhook_id, queue in self._queues.items():
+                if not queue:
+                    continue
                 
-                # Add signature if secret is available
-                if webhook_info.get("secret"):
-                    payload["signature"] = self._generate_signature(
-                        json.dumps(payload, sort_keys=True),
-                        webhook_info["secret"]
-                    )
+                webhook_info = self.webhooks.get(webhook_id)
+                if webhook_info is None or not webhook_info["active"]:
+                    queue.clear()
+                    continue
+                # Hold a cooling-down webhook's events (the deque bounds them) until its cooldown ends
+                if webhook_info["cooldown_until"] > now:
+                    continue
                 
-                # Send webhook
-                response = requests.post(
-                    webhook_info["url"],
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=30
-                )
+                due = force or len(queue) >= self.batch_size or now - self._queued_since[webhook_id] >= self.flush_interval
+                while due and queue:
+                    events = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                    deliveries.append((webhook_id, webhook_info, self._build_batch_payload(events)))
+                    # A partial remainder waits for the next batch unless this is a forced flush
+                    due = force or len(queue) >= self.batch_size
                 
-                if response.ok:
-                    console.print(f"[green]✅ Webhook sent to {webhook_id}[/green]")
-                    webhook_info["last_used"] = datetime.now().isoformat()
-                    webhook_info["failure_count"] = 0
-                else:
-                    console.print(f"[red]❌ Webhook failed to {webhook_id}: {response.status_code}[/red]")
-                    webhook_info["failure_count"] += 1
-                    
-                    # Disable webhook after 5 failures
-                    if webhook_info["failure_count"] >= 5:
-                        webhook_info["active"] = False
-                        console.print(f"[red]🚫 Disabled webhook {webhook_id} after 5 failures[/red]")
+                if queue:
+                    self._queued_since[webhook_id] = now
+        
+        return deliveries
+    
+    async def send_webhook_async(self, event_type: str, data: Dict[str, Any],
+                                 client: Optional["httpx.AsyncClient"] = None) -> List[bool]:
+        """Send webhook event to all subscribed endpoints concurrently"""
+        event, target_webhooks = self._prepare_event(event_type, data)
+        if client is not None:
+            return await self._dispatch(client, event, target_webhooks)
+        
+        client = _create_async_client()
+        try:
+            return await self._dispatch(client, event, target_webhooks)
+        finally:
+            if client is not None:
+                await client.aclose()
+    
+    async def _dispatch(self, client: Optional["httpx.AsyncClient"], event: WebhookEvent,
+                        target_webhooks: List[Tuple[str, Dict[str, Any]]]) -> List[bool]:
+        """Deliver a prepared event to its target webhooks, or queue it for their next batch"""
+        if not target_webhooks and not self._queues:
+            return []
+        
+        if self.batch_size <= 1:
+            payload = self._build_payload(event)
+            return await self._deliver_all(client, [
+                (webhook_id, webhook_info, payload)
+                for webhook_id, webhook_info in target_webhooks
+            ])
+        
+        # Batching: queue the encoded event and only send the endpoints whose batch is full or stale
+        entry = self._encode_batch_entry(event)
+        now = time.monotonic()
+        with self._queues_lock:
+            for webhook_id, _ in target_webhooks:
+                queue = self._queues[webhook_id]
+                if not queue:
+                    self._queued_since[webhook_id] = now
+                queue.append(entry)
+        
+        return await self._deliver_all(client, self._drain_queues())
+    
+    def send_webhook(self, event_type: str, data: Dict[str, Any]):
+        """Queue a webhook event for the background worker and return immediately"""
+        # Record the event and snapshot its targets here, so stats are current on return and the
+        # worker never walks the subscription index while this thread registers or unregisters
+        event, target_webhooks = self._prepare_event(event_type, data)
+        
+        with self._pending_ready:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped_events += 1
+                logger.warning("Webhook queue full, dropping oldest event")
+            self._pending.append((event, target_webhooks))
+            
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name="webhook-worker", daemon=True)
+                self._worker.start()
+                # The worker is a daemon, so send what is still queued before the interpreter exits
+                atexit.register(self._drain_at_exit)
+            self._pending_ready.notify()
+    
+    def _drain_at_exit(self):
+        """Give the worker time to send queued events, then flush partial batches"""
+        if not self.wait_for_webhooks(WEBHOOK_EXIT_TIMEOUT):
+            logger.warning("Exiting with %d webhook events still queued", len(self._pending))
+        if self.batch_size > 1:
+            _run_coroutine(self.flush_webhooks_async())
+    
+    def _run_worker(self):
+        """Deliver queued events on a private event loop, flushing stale batches while idle"""
+        loop = asyncio.new_event_loop()
+        # One client for the life of the worker, so every queued event reuses its connection pool
+        client = _create_async_client()
+        try:
+            while True:
+                with self._pending_ready:
+                    self._in_flight = 0
+                    if not self._pending:
+                        self._pending_ready.notify_all()
+                        # Wake up in time to send batches that go stale while no new events arrive
+                        with self._queues_lock:
+                            batches_waiting = self.batch_size > 1 and any(self._queues.values())
+                        self._pending_ready.wait(self.flush_interval if batches_waiting else None)
+                    events = list(self._pending)
+                    self._pending.clear()
+                    self._in_flight = len(events)
                 
-            except Exception as e:
-                console.print(f"[red]❌ Webhook error to {webhook_id}: {e}[/red]")
-                webhook_info["failure_count"] += 1
+                try:
+                    if events:
+                        loop.run_until_complete(self._send_events(client, events))
+                    elif self.batch_size > 1:
+                        loop.run_until_complete(self._deliver_all(client, self._drain_queues()))
+                except Exception:
+                    logger.exception("Webhook worker error")
+        finally:
+            if client is not None:
+                loop.run_until_complete(client.aclose())
+            loop.close()
+    
+    async def _send_events(self, client: Optional["httpx.AsyncClient"],
+                           events: List[Tuple[WebhookEvent, List[Tuple[str, Dict[str, Any]]]]]):
+        """Send a drained run of queued events concurrently over the worker's client"""
+        await asyncio.gather(*(
+            self._dispatch(client, event, target_webhooks) for event, target_webhooks in events
+        ), return_exceptions=True)
+    
+    def wait_for_webhooks(self, timeout: Optional[float] = None) -> bool:
+        """Block until the background worker has sent every queued event"""
+        with self._pending_ready:
+            return self._pending_ready.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+    
+    async def flush_webhooks_async(self, client: Optional["httpx.AsyncClient"] = None) -> List[bool]:
+        """Send every queued event now, regardless of batch size or age"""
+        deliveries = self._drain_queues(force=True)
+        if not deliveries or client is not None:
+            return await self._deliver_all(client, deliveries)
+        
+        client = _create_async_client()
+        try:
+            return await self._deliver_all(client, deliveries)
+        finally:
+            if client is not None:
+                await client.aclose()
+    
+    def flush_webhooks(self) -> List[bool]:
+        """Send every queued event now"""
+        self.wait_for_webhooks()
+        return _run_coroutine(self.flush_webhooks_async())
     
-    def _generate_signature(self, payload: str, secret: str) -> str:
+    def _generate_signature_digest(self, webhook_id: str, payload: bytes) -> bytes:
+        """Generate the raw HMAC-SHA256 digest of a webhook payload"""
+        signer = self._hmac_proto[webhook_id].copy()
+        signer.update(payload)
+        return signer.digest()
+    
+    def _generate_signature(self, webhook_id: str, payload: bytes) -> str:
         """Generate HMAC signature for webhook payload"""
-        return hmac.new(
-            secret.encode(),
-            payload.encode(),
-            hashlib.sha256
-        ).hexdigest()
-    
-    def verify_signature(self, payload: str, signature: str, webhook_id: str) -> bool:
-        """Verify webhook signature"""
-        if webhook_id not in self.secret_keys:
+        return self._generate_signature_digest(webhook_id, payload).hex()
+    
+    def verify_signature(self, payload: Union[str, bytes], signature: str, webhook_id: str) -> bool:
+        """Verify webhook signature against the raw request body"""
+        if webhook_id not in self._hmac_proto:
+            return False
+        
+        try:
+            provided = bytes.fromhex(signature)
+        except (TypeError, ValueError):
             return False
         
-        expected_signature = self._generate_signature(payload, self.secret_keys[webhook_id])
-        return hmac.compare_digest(signature, expected_signature)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        return hmac.compare_digest(self._generate_signature_digest(webhook_id, payload), provided)
     
     def get_webhook_stats(self) -> Dict[str, Any]:
         """Get webhook statistics"""
-        total_webhooks = len(self.webhooks)
-        active_webhooks = len([w for w in self.webhooks.values() if w["active"]])
-        total_events = len(self.event_history)
-        
-        event_counts = {}
-        for event in self.event_history:
-            event_counts[event.event_type] = event_counts.get(event.event_type, 0) + 1
-        
         return {
-            "total_webhooks": total_webhooks,
-            "active_webhooks": active_webhooks,
-            "total_events": total_events,
-            "event_counts": event_counts
+            "total_webhooks": len(self.webhooks),
+            "active_webhooks": len(self._active),
+            "total_events": self._events_total,
+            "queued_events": len(self._pending),
+            "dropped_events": self._dropped_events,
+            "event_counts": dict(self._event_counts)
         }
 
 class APIIntegrations:
     """External API integrations manager"""
     
-    def __init__(self):
+    def __init__(self, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT):
         self.endpoints = self._load_default_endpoints()
         self.integration_history = []
+        self.session = _create_session()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._prepare_request = functools.lru_cache(maxsize=REQUEST_CACHE_SIZE)(self._build_request)
+        # image_url -> (expiry, bytes), oldest first; uploads run on worker threads, hence the locks
+        self._img_cache = OrderedDict()
+        self._img_cache_bytes = 0
+        self._img_cache_lock = threading.Lock()
+        self._img_fetch_locks = {}
     
-    def _load_default_endpoints(self) -> Dict[str, APIEndpoint]:
+    def _load_default_endpoints(self) -> Mapping[str, APIEndpoint]:
         """Load default API endpoints"""
-        return {
+        return MappingProxyType({
             "discord": APIEndpoint(
                 name="Discord",
                 url="https://discord.com/api/webhooks/{webhook_id}/{token}",
@@ -241,11 +686,19 @@ class APIIntegrations:
                 auth_type="aws_signature",
                 description="Upload images to AWS S3"
             )
-        }
+        })
     
-    def send_to_discord(self, image_url: str, message: str, webhook_id: str, token: str):
-        """Send image to Discord channel"""
-        url = self.endpoints["discord"].url.format(webhook_id=webhook_id, token=token)
+    def _build_request(self, service: str, creds: Tuple[Tuple[str, str], ...]) -> Tuple[str, Mapping[str, str]]:
+        """Substitute credentials into a service's URL and header templates"""
+        endpoint = self.endpoints[service]
+        fields = dict(creds)
+        headers = {key: value.format(**fields) for key, value in endpoint.headers}
+        return endpoint.url.format(**fields), MappingProxyType(headers)
+    
+    def _discord_request(self, image_url: str, message: str, webhook_id: str,
+                         token: str) -> Tuple[str, Mapping[str, str], Dict[str, Any]]:
+        """Build the Discord webhook URL, headers and payload"""
+        url, headers = self._prepare_request("discord", (("webhook_id", webhook_id), ("token", token)))
         
         payload = {
             "content": message,
@@ -258,21 +711,11 @@ class APIIntegrations:
             }]
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=self.endpoints["discord"].headers)
-            if response.ok:
-                console.print("[green]✅ Image sent to Discord[/green]")
-                return True
-            else:
-                console.print(f"[red]❌ Discord error: {response.status_code}[/red]")
-                return False
-        except Exception as e:
-            console.print(f"[red]❌ Discord error: {e}[/red]")
-            return False
+        return url, headers, payload
     
-    def send_to_slack(self, image_url: str, message: str, token: str):
-        """Send image to Slack channel"""
-        url = self.endpoints["slack"].url.format(token=token)
+    def _slack_request(self, image_url: str, message: str, token: str) -> Tuple[str, Mapping[str, str], Dict[str, Any]]:
+        """Build the Slack webhook URL, headers and payload"""
+        url, headers = self._prepare_request("slack", (("token", token),))
         
         payload = {
             "text": message,
@@ -284,21 +727,12 @@ class APIIntegrations:
             }]
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=self.endpoints["slack"].headers)
-            if response.ok:
-                console.print("[green]✅ Image sent to Slack[/green]")
-                return True
-            else:
-                console.print(f"[red]❌ Slack error: {response.status_code}[/red]")
-                return False
-        except Exception as e:
-            console.print(f"[red]❌ Slack error: {e}[/red]")
-            return False
+        return url, headers, payload
     
-    def send_to_telegram(self, image_url: str, message: str, bot_token: str, chat_id: str):
-        """Send image to Telegram chat"""
-        url = self.endpoints["telegram"].url.format(token=bot_token)
+    def _telegram_request(self, image_url: str, message: str, bot_token: str,
+                          chat_id: str) -> Tuple[str, Mapping[str, str], Dict[str, Any]]:
+        """Build the Telegram sendPhoto URL, headers and payload"""
+        url, headers = self._prepare_request("telegram", (("token", bot_token),))
         
         payload = {
             "chat_id": chat_id,
@@ -306,48 +740,182 @@ class APIIntegrations:
             "caption": message
         }
         
+        return url, headers, payload
+    
+    def _report_post(self, service: str, status_code: Optional[int] = None, error: Optional[Exception] = None) -> bool:
+        """Log the outcome of a JSON post and return whether it succeeded"""
+        name = self.endpoints[service].name
+        if error is not None:
+            logger.warning("%s error: %s", name, error)
+            return False
+        if status_code < 400:
+            logger.info("Image sent to %s", name)
+            return True
+        logger.warning("%s error: %s", name, status_code)
+        return False
+    
+    def _post_json(self, service: str, url: str, headers: Mapping[str, str], payload: Dict[str, Any]) -> bool:
+        """POST a JSON payload to a service through the pooled session"""
+        try:
+            response = self.session.post(url, data=_dumps(payload), headers=headers,
+                                         timeout=(self.connect_timeout, self.read_timeout))
+        except Exception as e:
+            return self._report_post(service, error=e)
+        
+        return self._report_post(service, response.status_code)
+    
+    async def _post_json_async(self, client: "httpx.AsyncClient", service: str, url: str,
+                               headers: Mapping[str, str], payload: Dict[str, Any]) -> bool:
+        """POST a JSON payload to a service through the shared async client"""
         try:
-            response = requests.post(url, json=payload, headers=self.endpoints["telegram"].headers)
-            if response.ok:
-                console.print("[green]✅ Image sent to Telegram[/green]")
-                return True
-            else:
-                console.print(f"[red]❌ Telegram error: {response.status_code}[/red]")
-                return False
+            response = await client.post(
+                url,
+                content=_dumps(payload),
+                headers=headers,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            )
         except Exception as e:
-            console.print(f"[red]❌ Telegram error: {e}[/red]")
-            return False
+            return self._report_post(service, error=e)
+        
+        return self._report_post(service, response.status_code)
+    
+    def send_to_discord(self, image_url: str, message: str, webhook_id: str, token: str):
+        """Send image to Discord channel"""
+        url, headers, payload = self._discord_request(image_url, message, webhook_id, token)
+        return self._post_json("discord", url, headers, payload)
+    
+    def send_to_slack(self, image_url: str, message: str, token: str):
+        """Send image to Slack channel"""
+        url, headers, payload = self._slack_request(image_url, message, token)
+        return self._post_json("slack", url, headers, payload)
+    
+    def send_to_telegram(self, image_url: str, message: str, bot_token: str, chat_id: str):
+        """Send image to Telegram chat"""
+        url, headers, payload = self._telegram_request(image_url, message, bot_token, chat_id)
+        return self._post_json("telegram", url, headers, payload)
+    
+    async def send_to_discord_async(self, client: "httpx.AsyncClient", image_url: str, message: str,
+                                    webhook_id: str, token: str) -> bool:
+        """Send image to Discord channel through a shared async client"""
+        url, headers, payload = self._discord_request(image_url, message, webhook_id, token)
+        return await self._post_json_async(client, "discord", url, headers, payload)
+    
+    async def send_to_slack_async(self, client: "httpx.AsyncClient", image_url: str, message: str, token: str) -> bool:
+        """Send image to Slack channel through a shared async client"""
+        url, headers, payload = self._slack_request(image_url, message, token)
+        return await self._post_json_async(client, "slack", url, headers, payload)
+    
+    async def send_to_telegram_async(self, client: "httpx.AsyncClient", image_url: str, message: str,
+                                     bot_token: str, chat_id: str) -> bool:
+        """Send image to Telegram chat through a shared async client"""
+        url, headers, payload = self._telegram_request(image_url, message, bot_token, chat_id)
+        return await self._post_json_async(client, "telegram", url, headers, payload)
+    
+    def _cached_image(self, image_url: str) -> Optional[bytes]:
+        """Return a cached download that has not expired yet; the caller holds the cache lock"""
+        entry = self._img_cache.get(image_url)
+        if entry is None:
+            return None
+        
+        expires, data = entry
+        if expires <= time.monotonic():
+            del self._img_cache[image_url]
+            self._img_cache_bytes -= len(data)
+            return None
+        return data
+    
+    def _store_image(self, image_url: str, data: bytes):
+        """Cache a download, evicting the oldest entries past the size limits; the caller holds the cache lock"""
+        if len(data) > IMAGE_CACHE_MAX_BYTES:
+            return
+        
+        previous = self._img_cache.pop(image_url, None)
+        if previous is not None:
+            self._img_cache_bytes -= len(previous[1])
+        self._img_cache[image_url] = (time.monotonic() + IMAGE_CACHE_TTL, data)
+        self._img_cache_bytes += len(data)
+        
+        while len(self._img_cache) > IMAGE_CACHE_SIZE or self._img_cache_bytes > IMAGE_CACHE_MAX_BYTES:
+            _, (_, evicted) = self._img_cache.popitem(last=False)
+            self._img_cache_bytes -= len(evicted)
+    
+    def _fetch_image(self, image_url: str) -> Union[bytes, BinaryIO, None]:
+        """Download an image once and share it between uploads of the same URL; oversize images come back spooled to disk"""
+        with self._img_cache_lock:
+            data = self._cached_image(image_url)
+            if data is not None:
+                return data
+            fetch_lock = self._img_fetch_locks.setdefault(image_url, threading.Lock())
+        
+        # Concurrent uploads of one URL wait for a single download instead of each fetching it
+        with fetch_lock:
+            try:
+                with self._img_cache_lock:
+                    data = self._cached_image(image_url)
+                if data is not None:
+                    return data
+                
+                # Stream into a spool that moves to a temporary file once it outgrows the cache cap
+                spool = tempfile.SpooledTemporaryFile(max_size=IMAGE_CACHE_MAX_BYTES)
+                try:
+                    with self.session.get(image_url, stream=True,
+                                          timeout=(self.connect_timeout, self.read_timeout)) as response:
+                        if not response.ok:
+                            logger.warning("Failed to download image: %s", image_url)
+                            spool.close()
+                            return None
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            spool.write(chunk)
+                except BaseException:
+                    spool.close()
+                    raise
+                
+                size = spool.tell()
+                spool.seek(0)
+                if size > IMAGE_CACHE_MAX_BYTES:
+                    # Too large to cache, so the caller streams the file and closes it
+                    return spool
+                
+                with spool:
+                    data = spool.read()
+                with self._img_cache_lock:
+                    self._store_image(image_url, data)
+                return data
+            finally:
+                with self._img_cache_lock:
+                    self._img_fetch_locks.pop(image_url, None)
     
     def upload_to_dropbox(self, image_url: str, filename: str, access_token: str):
         """Upload image to Dropbox"""
-        url = self.endpoints["dropbox"].url
-        headers = self.endpoints["dropbox"].headers.copy()
-        headers["Authorization"] = headers["Authorization"].format(token=access_token)
-        headers["Dropbox-API-Arg"] = json.dumps({"path": f"/{filename}"})
+        url, auth_headers = self._prepare_request("dropbox", (("token", access_token),))
+        headers = {**auth_headers, "Dropbox-API-Arg": _dumps_header({"path": f"/{filename}"})}
         
+        image_data = None
         try:
-            # Download image first
-            image_response = requests.get(image_url)
-            if not image_response.ok:
-                console.print("[red]❌ Failed to download image[/red]")
+            image_data = self._fetch_image(image_url)
+            if image_data is None:
                 return False
             
-            response = requests.post(url, data=image_response.content, headers=headers)
+            headers["Content-Type"] = "application/octet-stream"
+            image_chunks, image_size = _image_chunks(image_data)
+            response = self.session.post(url, data=_StreamedBody(image_chunks, image_size), headers=headers,
+                                         timeout=(self.connect_timeout, self.read_timeout))
             if response.ok:
-                console.print("[green]✅ Image uploaded to Dropbox[/green]")
+                logger.info("Image uploaded to Dropbox")
                 return True
             else:
-                console.print(f"[red]❌ Dropbox error: {response.status_code}[/red]")
+                logger.warning("Dropbox error: %s", response.status_code)
                 return False
         except Exception as e:
-            console.print(f"[red]❌ Dropbox error: {e}[/red]")
+            logger.warning("Dropbox error: %s", e)
             return False
+        finally:
+            _release_image(image_data)
     
     def upload_to_google_drive(self, image_url: str, filename: str, access_token: str):
         """Upload image to Google Drive"""
-        url = self.endpoints["google_drive"].url
-        headers = self.endpoints["google_drive"].headers.copy()
-        headers["Authorization"] = headers["Authorization"].format(token=access_token)
+        url, auth_headers = self._prepare_request("google_drive", (("token", access_token),))
+        headers = dict(auth_headers)
         
         # Prepare metadata
         metadata = {
@@ -355,81 +923,145 @@ class APIIntegrations:
             "parents": ["root"]
         }
         
+        image_data = None
         try:
-            # Download image first
-            image_response = requests.get(image_url)
-            if not image_response.ok:
-                console.print("[red]❌ Failed to download image[/red]")
+            image_data = self._fetch_image(image_url)
+            if image_data is None:
                 return False
             
-            # Create multipart upload
-            files = {
-                "metadata": (None, json.dumps(metadata), "application/json"),
-                "file": (filename, image_response.content, "image/jpeg")
-            }
+            # Create multipart upload, framing the (shared or spooled) image between the part headers without copying it
+            boundary = uuid.uuid4().hex
+            head = b"".join((
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="metadata"\r\n'
+                f"Content-Type: application/json\r\n\r\n".encode(),
+                _dumps(metadata),
+                f"\r\n--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                f"Content-Type: image/jpeg\r\n\r\n".encode()
+            ))
+            tail = f"\r\n--{boundary}--\r\n".encode()
             
-            response = requests.post(url, files=files, headers=headers)
+            image_chunks, image_size = _image_chunks(image_data)
+            body = _StreamedBody(itertools.chain((head,), image_chunks, (tail,)), len(head) + image_size + len(tail))
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+            response = self.session.post(url, data=body, headers=headers,
+                                         timeout=(self.connect_timeout, self.read_timeout))
             if response.ok:
-                console.print("[green]✅ Image uploaded to Google Drive[/green]")
+                logger.info("Image uploaded to Google Drive")
                 return True
             else:
-                console.print(f"[red]❌ Google Drive error: {response.status_code}[/red]")
+                logger.warning("Google Drive error: %s", response.status_code)
                 return False
         except Exception as e:
-            console.print(f"[red]❌ Google Drive error: {e}[/red]")
+            logger.warning("Google Drive error: %s", e)
             return False
+        finally:
+            _release_image(image_data)
     
-    def batch_export(self, image_urls: List[str], export_configs: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Export multiple images to various services"""
-        results = {
-            "total_images": len(image_urls),
-            "successful_exports": 0,
-            "failed_exports": 0,
-            "export_results": []
-        }
+    def _export_one(self, index: int, image_url: str, config: Dict[str, Any]) -> bool:
+        """Export a single image to the service named in its config"""
+        service = config.get("service")
         
-        console.print(f"[cyan]📤 Batch exporting {len(image_urls)} images to {len(export_configs)} services[/cyan]")
+        if service == "discord":
+            return self.send_to_discord(
+                image_url,
+                config.get("message", "Generated image"),
+                config.get("webhook_id"),
+                config.get("token")
+            )
+        elif service == "slack":
+            return self.send_to_slack(
+                image_url,
+                config.get("message", "Generated image"),
+                config.get("token")
+            )
+        elif service == "telegram":
+            return self.send_to_telegram(
+                image_url,
+                config.get("message", "Generated image"),
+                config.get("bot_token"),
+                config.get("chat_id")
+            )
+        elif service == "dropbox":
+            return self.upload_to_dropbox(
+                image_url,
+                config.get("filename", f"image_{index}.jpg"),
+                config.get("access_token")
+            )
+        elif service == "google_drive":
+            return self.upload_to_google_drive(
+                image_url,
+                config.get("filename", f"image_{index}.jpg"),
+                config.get("access_token")
+            )
         
-        for i, (image_url, config) in enumerate(zip(image_urls, export_configs)):
-            service = config.get("service")
-            success = False
-            
+        return False
+    
+    def _export_one_async(self, client: Optional["httpx.AsyncClient"], index: int, image_url: str,
+                          config: Dict[str, Any]) -> Awaitable[bool]:
+        """Build the coroutine that exports a single image without blocking the event loop"""
+        service = config.get("service")
+        
+        # JSON posts share the async client; uploads stream through the pooled session on a worker thread
+        if client is not None:
             if service == "discord":
-                success = self.send_to_discord(
+                return self.send_to_discord_async(
+                    client,
                     image_url,
                     config.get("message", "Generated image"),
                     config.get("webhook_id"),
                     config.get("token")
                 )
             elif service == "slack":
-                success = self.send_to_slack(
+                return self.send_to_slack_async(
+                    client,
                     image_url,
                     config.get("message", "Generated image"),
                     config.get("token")
                 )
             elif service == "telegram":
-                success = self.send_to_telegram(
+                return self.send_to_telegram_async(
+                    client,
                     image_url,
                     config.get("message", "Generated image"),
                     config.get("bot_token"),
                     config.get("chat_id")
                 )
-            elif service == "dropbox":
-                success = self.upload_to_dropbox(
-                    image_url,
-                    config.get("filename", f"image_{i}.jpg"),
-                    config.get("access_token")
-                )
-            elif service == "google_drive":
-                success = self.upload_to_google_drive(
-                    image_url,
-                    config.get("filename", f"image_{i}.jpg"),
-                    config.get("access_token")
-                )
+        
+        return asyncio.get_running_loop().run_in_executor(None, self._export_one, index, image_url, config)
+    
+    async def batch_export_async(self, image_urls: List[str], export_configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Export multiple images to various services concurrently"""
+        results = {
+            "total_images": len(image_urls),
+            "successful_exports": 0,
+            "failed_exports": 0,
+            "export_results": []
+        }
+        
+        console.print(f"[cyan]📤 Batch exporting {len(image_urls)} images to {len(export_configs)} services[/cyan]")
+        
+        exports = list(zip(image_urls, export_configs))
+        client = _create_async_client()
+        try:
+            coros = [
+                self._export_one_async(client, i, image_url, config)
+                for i, (image_url, config) in enumerate(exports)
+            ]
+            outcomes = await asyncio.gather(*coros, return_exceptions=True)
+        finally:
+            if client is not None:
+                await client.aclose()
+        
+        for (image_url, config), outcome in zip(exports, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning("Export error to %s: %s", config.get("service"), outcome)
+            success = outcome is True
             
             results["export_results"].append({
                 "image_url": image_url,
-                "service": service,
+                "service": config.get("service"),
                 "success": success
             })
             
@@ -440,6 +1072,10 @@ class APIIntegrations:
         
         return results
     
+    def batch_export(self, image_urls: List[str], export_configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Export multiple images to various services"""
+        return _run_coroutine(self.batch_export_async(image_urls, export_configs))
+    
     def display_integrations(self):
         """Display available integrations"""
         console.print("\n[bold cyan]🔗 Available API Integrations[/bold cyan]")
@@ -541,7 +1177,8 @@ def demo_webhooks_and_integrations():
     console.print(f"Successful: {batch_result['successful_exports']}")
     console.print(f"Failed: {batch_result['failed_exports']}")
     
-    # Webhook statistics
+    # Webhook statistics, once the background worker has sent the queued events
+    webhook_manager.wait_for_webhooks(WEBHOOK_EXIT_TIMEOUT)
     webhook_stats = webhook_manager.get_webhook_stats()
     
     stats_panel = Panel(
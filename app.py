@@ -1,20 +1,53 @@
 import os
+import json
 import asyncio
+import functools
 import requests
+from requests.adapters import HTTPAdapter
 import time
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
 from rich.panel import Panel
 from rich.text import Text
 from rich.prompt import Prompt, Confirm
 from rich.table import Table
 from rich.prompt import Confirm
-from utils import save_image_from_url
+from typing import Optional, Tuple
+from utils import save_image_from_url_async, save_image_from_b64
 from config_manager import config
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Initialize Rich console
 console = Console()
 
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Local backend that serves image generations
+SERVER_URL = 'http://127.0.0.1:10000'
+
+# Pooled session reused for the sync fallbacks, so each call skips the TCP handshake
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+
+# Seconds a backend health result is trusted before the server is probed again
+HEALTH_CHECK_TTL = 5.0
+
+# Timeout, in seconds, for a health probe made between generations
+HEALTH_CHECK_TIMEOUT = 1.0
+
+# Timeout, in seconds, for the health probe at startup
+STARTUP_HEALTH_TIMEOUT = 1.5
+
 def print_banner():
     banner_text = Text("🍌 Nano Banana Image Generator", style="bold blue")
     console.print(Panel(banner_text, style="blue", padding=(1, 2)))
@@ -70,44 +103,56 @@ def get_prompt(prompt_type="creation"):
             console.print(f"[red]Error: {e}[/red]")
             continue
 
+def _build_settings_table() -> Table:
+    """Build the settings table from the current configuration"""
+    # Read each setting once; the table is rebuilt only after a change
+    output_format = config.get('default_settings', 'output_format', 'jpg')
+    resolution = config.get('default_settings', 'resolution', '1024x1024')
+    quality = config.get('default_settings', 'quality', 'high')
+    show_progress = config.get('ui_settings', 'show_progress', True)
+    fallback_enabled = config.get('advanced_settings', 'fallback_enabled', True)
+    
+    # Create settings table
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Setting", style="cyan", width=25)
+    table.add_column("Current Value", style="green")
+    table.add_column("Description", style="yellow")
+    
+    # Add current settings
+    table.add_row(
+        "Output Format", 
+        output_format,
+        "Image format (jpg, png, webp)"
+    )
+    table.add_row(
+        "Resolution", 
+        resolution,
+        "Image dimensions"
+    )
+    table.add_row(
+        "Quality", 
+        quality,
+        "Image quality (low, medium, high)"
+    )
+    table.add_row(
+        "Show Progress", 
+        str(show_progress),
+        "Display progress bars"
+    )
+    table.add_row(
+        "Fallback Enabled", 
+        str(fallback_enabled),
+        "Use fallback when API fails"
+    )
+    
+    return table
+
 def show_settings_menu():
     """Display and manage application settings"""
+    table = _build_settings_table()
     while True:
         console.print("\n[bold cyan]Settings Menu[/bold cyan]")
         
-        # Create settings table
-        table = Table(show_header=True, header_style="bold magenta")
-        table.add_column("Setting", style="cyan", width=25)
-        table.add_column("Current Value", style="green")
-        table.add_column("Description", style="yellow")
-        
-        # Add current settings
-        table.add_row(
-            "Output Format", 
-            config.get('default_settings', 'output_format', 'jpg'),
-            "Image format (jpg, png, webp)"
-        )
-        table.add_row(
-            "Resolution", 
-            config.get('default_settings', 'resolution', '1024x1024'),
-            "Image dimensions"
-        )
-        table.add_row(
-            "Quality", 
-            config.get('default_settings', 'quality', 'high'),
-            "Image quality (low, medium, high)"
-        )
-        table.add_row(
-            "Show Progress", 
-            str(config.get('ui_settings', 'show_progress', True)),
-            "Display progress bars"
-        )
-        table.add_row(
-            "Fallback Enabled", 
-            str(config.get('advanced_settings', 'fallback_enabled', True)),
-            "Use fallback when API fails"
-        )
-        
         console.print(table)
         
         console.print("\n[bold cyan]Settings Options:[/bold cyan]")
@@ -128,6 +173,7 @@ def show_settings_menu():
                 default=config.get('default_settings', 'output_format', 'jpg')
             )
             config.set('default_settings', 'output_format', new_format)
+            table = _build_settings_table()
             console.print(f"[green]✅ Output format set to {new_format}[/green]")
             
         elif choice == "2":
@@ -137,18 +183,19 @@ def show_settings_menu():
                 default=config.get('default_settings', 'resolution', '1024x1024')
             )
             config.set('default_settings', 'resolution', new_resolution)
+            table = _build_settings_table()
             console.print(f"[green]✅ Resolution set to {new_resolution}[/green]")
             
         elif choice == "3":
-            current = config.get('ui_settings', 'show_progress', True)
-            new_value = not current
+            new_value = not config.get('ui_settings', 'show_progress', True)
             config.set('ui_settings', 'show_progress', new_value)
+            table = _build_settings_table()
             console.print(f"[green]✅ Progress display {'enabled' if new_value else 'disabled'}[/green]")
             
         elif choice == "4":
-            current = config.get('advanced_settings', 'fallback_enabled', True)
-            new_value = not current
+            new_value = not config.get('advanced_settings', 'fallback_enabled', True)
             config.set('advanced_settings', 'fallback_enabled', new_value)
+            table = _build_settings_table()
             console.print(f"[green]✅ Fallback {'enabled' if new_value else 'disabled'}[/green]")
             
         elif choice == "5":
@@ -157,6 +204,7 @@ def show_settings_menu():
         elif choice == "6":
             if Confirm.ask("Are you sure you want to reset all settings to defaults?"):
                 config.reset_to_defaults()
+                table = _build_settings_table()
                 console.print("[green]✅ Settings reset to defaults[/green]")
             else:
                 console.print("[yellow]Settings reset cancelled[/yellow]")
@@ -164,30 +212,138 @@ def show_settings_menu():
         elif choice == "7":
             break
 
+def create_client() -> Optional["httpx.AsyncClient"]:
+    """Create the async client shared by the main loop, or None when httpx is missing"""
+    if httpx is None:
+        return None
+    
+    timeout = httpx.Timeout(10, connect=3)
+    # httpx does not follow redirects by default; requests did, and image hosts often redirect
+    try:
+        return httpx.AsyncClient(http2=True, timeout=timeout, follow_redirects=True)
+    except ImportError:
+        return httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+
+async def check_server(client: Optional["httpx.AsyncClient"], timeout: float = STARTUP_HEALTH_TIMEOUT) -> bool:
+    """Check whether the local server answers within timeout seconds, without blocking the event loop"""
+    if client is None:
+        probe = asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(SESSION.get, f'{SERVER_URL}/health', timeout=timeout)
+        )
+    else:
+        probe = client.get(f'{SERVER_URL}/health', timeout=timeout)
+    
+    # wait_for bounds the whole probe, including DNS and a slow worker thread, not just each socket operation
+    try:
+        await asyncio.wait_for(probe, timeout)
+        return True
+    except Exception:
+        return False
+
+class BackendSelector:
+    """Pick the local server or direct API calls, re-probing the server at most every HEALTH_CHECK_TTL seconds"""
+    
+    def __init__(self, client: Optional["httpx.AsyncClient"]):
+        self.client = client
+        self.state, self.last_check = "unknown", 0.0
+    
+    async def endpoint(self, timeout: float = HEALTH_CHECK_TIMEOUT) -> str:
+        """Return "local" or "direct", probing the server only when the cached result is stale"""
+        if self.state != "unknown" and time.monotonic() - self.last_check <= HEALTH_CHECK_TTL:
+            return self.state
+        
+        previous = self.state
+        self.state = "local" if await check_server(self.client, timeout) else "direct"
+        self.last_check = time.monotonic()
+        
+        if previous == "direct" and self.state == "local":
+            console.print("✅ [green]Local server is back, switching to it[/green]")
+        elif previous == "local" and self.state == "direct":
+            console.print("❌ [yellow]Local server went away, using direct API calls[/yellow]")
+        return self.state
+    
+    def invalidate(self):
+        """Force a fresh probe before the next generation"""
+        self.last_check = 0.0
+
+async def request_generation(client: Optional["httpx.AsyncClient"], payload: dict) -> Tuple[Optional[str], Optional[str]]:
+    """Ask the local server for an image and return its (url, inline base64 data)"""
+    if client is None:
+        response = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(SESSION.post, f'{SERVER_URL}/v1/image/generations', json=payload, timeout=120)
+        )
+    else:
+        response = await client.post(f'{SERVER_URL}/v1/image/generations', json=payload, timeout=120)
+    
+    image = _loads(response.content)['data'][0]
+    # Backends that return the image inline let us skip downloading it again
+    if image.get('b64_json'):
+        return image.get('url'), image['b64_json']
+    return image['url'], None
+
+async def save_result(client: Optional["httpx.AsyncClient"], image_url: Optional[str],
+                      image_data: Optional[str], output_dir: str, output_format: str) -> str:
+    """Save a generated image, writing inline data directly or streaming it from its URL"""
+    if image_data:
+        return save_image_from_b64(image_data, output_dir, output_format)
+    return await save_image_from_url_async(client, image_url, output_dir, output_format)
+
+async def generate(client: Optional["httpx.AsyncClient"], generator, use_local_server: bool, prompt: str,
+                   image_path: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """Create (or, given image_path, edit) an image and return its (url, inline base64 data)"""
+    if use_local_server:
+        payload = {'prompt': prompt} if image_path is None else {'prompt': prompt, 'image_url': image_path}
+        return await request_generation(client, payload)
+    if image_path is None:
+        return await generator.create_image(prompt), None
+    return await generator.edit_image(prompt, image_path), None
+
+async def run_with_progress(progress: Progress, show_progress: bool, description: str, work):
+    """Await work under the session's shared spinner, or with a plain notice when progress is off"""
+    if not show_progress:
+        console.print(f"[yellow]{description}[/yellow]")
+        return await work
+    
+    task = progress.add_task(description, total=None)
+    # Progress refreshes on its own thread, so the spinner keeps moving while the work is awaited
+    progress.start()
+    try:
+        return await work
+    finally:
+        progress.stop()
+        progress.remove_task(task)
+
 async def main():
+    client = create_client()
+    try:
+        await run(client)
+    finally:
+        if client is not None:
+            await client.aclose()
+
+async def run(client: Optional["httpx.AsyncClient"]):
     print_banner()
     
     # Create output directory
     output_dir = "output_images"
     os.makedirs(output_dir, exist_ok=True)
     
-    # Check if local server is running
-    with Progress(
+    # One progress display for the whole session; each operation adds and removes its own task
+    progress = Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
+        TimeElapsedColumn(),
         console=console,
-    ) as progress:
-        task = progress.add_task("Checking server status...", total=None)
-        
-        try:
-            response = requests.get('http://127.0.0.1:10000/health', timeout=5)
-            console.print("✅ [green]Local server is running[/green]")
-            use_local_server = True
-        except:
-            console.print("❌ [yellow]Local server not found, using direct API calls[/yellow]")
-            from utils import ImageGenerator
-            generator = ImageGenerator()
-            use_local_server = False
+        transient=True,
+    )
+    
+    # Check if local server is running
+    selector = BackendSelector(client)
+    generator = None
+    if await run_with_progress(progress, True, "Checking server status...", selector.endpoint(timeout=STARTUP_HEALTH_TIMEOUT)) == "local":
+        console.print("✅ [green]Local server is running[/green]")
+    else:
+        console.print("❌ [yellow]Local server not found, using direct API calls[/yellow]")
     
     while True:
         choice = get_user_choice()
@@ -199,6 +355,15 @@ async def main():
             console.print("\n[bold green]Thank you for using Nano Banana Image Generator! 🍌[/bold green]")
             break
         
+        # Settings can change from the menu, so read them once per generation rather than per use
+        show_progress = config.get('ui_settings', 'show_progress', True)
+        output_format = config.get('default_settings', 'output_format', 'jpg')
+        # Cached between probes, so a server that starts or stops mid-session is picked up within seconds
+        use_local_server = await selector.endpoint() == "local"
+        if not use_local_server and generator is None:
+            from utils import ImageGenerator
+            generator = ImageGenerator(session=SESSION)
+        
         try:
             if choice == '1':  # Create new image
                 prompt = get_prompt("creation")
@@ -208,39 +373,10 @@ async def main():
                     
                 console.print(f"\n[bold cyan]Creating image with prompt:[/bold cyan] [italic]'{prompt}'[/italic]")
                 
-                # Create progress bar for image generation (if enabled)
-                show_progress = config.get('ui_settings', 'show_progress', True)
-                
-                if show_progress:
-                    with Progress(
-                        SpinnerColumn(),
-                        TextColumn("[progress.description]{task.description}"),
-                        BarColumn(),
-                        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                        TimeElapsedColumn(),
-                        console=console,
-                    ) as progress:
-                        task = progress.add_task("Generating image...", total=100)
-                        
-                        # Simulate progress updates
-                        for i in range(0, 101, 10):
-                            progress.update(task, advance=10, description=f"Generating image... ({i}%)")
-                            await asyncio.sleep(0.1)
-                        
-                        if use_local_server:
-                            response = requests.post('http://127.0.0.1:10000/v1/image/generations', 
-                                                   json={'prompt': prompt}, timeout=120)
-                            image_url = response.json()['data'][0]['url']
-                        else:
-                            image_url = await generator.create_image(prompt)
-                else:
-                    console.print("[yellow]Generating image... Please wait...[/yellow]")
-                    if use_local_server:
-                        response = requests.post('http://127.0.0.1:10000/v1/image/generations', 
-                                               json={'prompt': prompt}, timeout=120)
-                        image_url = response.json()['data'][0]['url']
-                    else:
-                        image_url = await generator.create_image(prompt)
+                image_url, image_data = await run_with_progress(
+                    progress, show_progress, "Generating image...",
+                    generate(client, generator, use_local_server, prompt)
+                )
                 
             elif choice == '2':  # Edit existing image
                 image_path = get_image_path()
@@ -255,70 +391,29 @@ async def main():
                     
                 console.print(f"\n[bold cyan]Editing image with prompt:[/bold cyan] [italic]'{prompt}'[/italic]")
                 
-                # Create progress bar for image editing (if enabled)
-                if show_progress:
-                    with Progress(
-                        SpinnerColumn(),
-                        TextColumn("[progress.description]{task.description}"),
-                        BarColumn(),
-                        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                        TimeElapsedColumn(),
-                        console=console,
-                    ) as progress:
-                        task = progress.add_task("Processing image...", total=100)
-                        
-                        # Simulate progress updates
-                        for i in range(0, 101, 10):
-                            progress.update(task, advance=10, description=f"Processing image... ({i}%)")
-                            await asyncio.sleep(0.1)
-                        
-                        if use_local_server:
-                            response = requests.post('http://127.0.0.1:10000/v1/image/generations', 
-                                                   json={'prompt': prompt, 'image_url': image_path}, timeout=120)
-                            image_url = response.json()['data'][0]['url']
-                        else:
-                            image_url = await generator.edit_image(prompt, image_path)
-                else:
-                    console.print("[yellow]Processing image... Please wait...[/yellow]")
-                    if use_local_server:
-                        response = requests.post('http://127.0.0.1:10000/v1/image/generations', 
-                                               json={'prompt': prompt, 'image_url': image_path}, timeout=120)
-                        image_url = response.json()['data'][0]['url']
-                    else:
-                        image_url = await generator.edit_image(prompt, image_path)
+                image_url, image_data = await run_with_progress(
+                    progress, show_progress, "Processing image...",
+                    generate(client, generator, use_local_server, prompt, image_path)
+                )
             
             # Save the generated image with progress
-            if show_progress:
-                with Progress(
-                    SpinnerColumn(),
-                    TextColumn("[progress.description]{task.description}"),
-                    console=console,
-                ) as progress:
-                    save_task = progress.add_task("Saving image to output folder...", total=None)
-                    saved_path = save_image_from_url(
-                        image_url, 
-                        output_dir, 
-                        config.get('default_settings', 'output_format', 'jpg')
-                    )
-            else:
-                console.print("[yellow]Saving image to output folder...[/yellow]")
-                saved_path = save_image_from_url(
-                    image_url, 
-                    output_dir, 
-                    config.get('default_settings', 'output_format', 'jpg')
-                )
+            saved_path = await run_with_progress(
+                progress, show_progress, "Saving image to output folder...",
+                save_result(client, image_url, image_data, output_dir, output_format)
+            )
             
             # Success message with nice formatting
             success_panel = Panel(
                 f"[bold green]✅ Process completed successfully![/bold green]\n\n"
                 f"[cyan]Image saved to:[/cyan] [yellow]{saved_path}[/yellow]\n"
-                f"[cyan]Original URL:[/cyan] [blue]{image_url}[/blue]",
+                f"[cyan]Original URL:[/cyan] [blue]{image_url or 'returned inline'}[/blue]",
                 title="Success",
                 border_style="green"
             )
             console.print(success_panel)
             
         except Exception as e:
+            selector.invalidate()
             error_panel = Panel(
                 f"[bold red]❌ Error: {str(e)}[/bold red]\n\n"
                 f"[yellow]Please try again.[/yellow]",
@@ -4,27 +4,217 @@ Batch processing utility for Nano Banana Image Generator
 """
 
 import asyncio
+import aiofiles
+import functools
+import io
 import json
+import re
+import sys
 import time
-from typing import List, Dict, Any
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 from rich.table import Table
 from rich.panel import Panel
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 console = Console()
 
+# Generation requests allowed in flight at once
+DEFAULT_CONCURRENCY = 5
+
+# Generation requests allowed to start per second; None disables the limit
+DEFAULT_RATE_LIMIT = 10
+
+# Seconds allowed for one image generation request
+GENERATION_TIMEOUT = 120
+
+# Seconds allowed for the startup health check
+HEALTH_CHECK_TIMEOUT = 1.5
+
+# Responses larger than this are scanned for the image URL instead of parsed whole
+PARTIAL_PARSE_THRESHOLD = 64 * 1024
+
+# Batch progress descriptions are rewritten on the first result, every this many results after it, and the last
+PROGRESS_DESCRIPTION_EVERY = 10
+
+# Image downloads allowed in flight at once
+DOWNLOAD_CONCURRENCY = 8
+
+# Seconds allowed for one image download
+DOWNLOAD_TIMEOUT = 30
+
+# Chunk size used when streaming downloaded images to disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Characters dropped from prompts used in filenames: anything but word characters, spaces and hyphens
+_FILENAME_UNSAFE = re.compile(r"[^\w \-]")
+
+# Progress descriptions for finished generations, filled with the start of the prompt
+_SUCCESS_DESCRIPTION = "✅ Success: {}..."
+_FAILED_DESCRIPTION = "❌ Failed: {}..."
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+def _dumps(data: Any) -> bytes:
+    """Serialize data as indented JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+def _extract_url(content: bytes) -> str:
+    """Pull data[0].url out of a generation response"""
+    # ijson stops at the first URL, skipping whatever metadata follows; small bodies parse faster whole
+    if ijson is not None and len(content) > PARTIAL_PARSE_THRESHOLD:
+        for url in ijson.items(io.BytesIO(content), 'data.item.url'):
+            return url
+        raise KeyError("url")
+    return _loads(content)["data"][0]["url"]
+
+def _short(text: Optional[str], width: int, default: str = "N/A") -> str:
+    """Truncate text to width characters for a table cell, allocating only when it is too long"""
+    if not text:
+        return default
+    return text[:width - 1] + "…" if len(text) > width else text
+
+class _TokenBucket:
+    """Async token bucket that lets max_rate acquisitions through per time_period seconds"""
+    def __init__(self, max_rate: float, time_period: float = 1.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._tokens = max_rate
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                refill = (now - self._last) * self.max_rate / self.time_period
+                self._tokens = min(self.max_rate, self._tokens + refill)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.time_period / self.max_rate)
+
 class BatchProcessor:
-    def __init__(self, api_base: str = "http://127.0.0.1:10000"):
+    def __init__(self, api_base: str = "http://127.0.0.1:10000", concurrency: int = DEFAULT_CONCURRENCY,
+                 rate_limit: Optional[float] = DEFAULT_RATE_LIMIT):
         self.api_base = api_base
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
         self.results = []
+        # Pooled session for downloads, the health check and the generation fallback without httpx
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, DOWNLOAD_CONCURRENCY))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
     
-    async def process_batch(self, prompts: List[str], **kwargs) -> List[Dict[str, Any]]:
+    def _create_client(self, concurrency: int, timeout: float) -> Optional["httpx.AsyncClient"]:
+        """Create an async client sized to the given concurrency, or None without httpx"""
+        if httpx is None:
+            return None
+        
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency,
+                              keepalive_expiry=30)
+        # Follow redirects like the requests session does; httpx does not by default
+        return httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True)
+    
+    async def check_health(self, timeout: float = HEALTH_CHECK_TIMEOUT) -> bool:
+        """Check that the server answers /health successfully within timeout seconds"""
+        try:
+            response = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(self.session.get, f"{self.api_base}/health", timeout=timeout)
+                ),
+                timeout
+            )
+            return response.ok
+        except Exception:
+            return False
+    
+    async def _post_generation(self, client: Optional["httpx.AsyncClient"], payload: Dict[str, Any]):
+        """POST one generation request without blocking the event loop"""
+        url = f"{self.api_base}/v1/image/generations"
+        if client is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self.session.post, url, json=payload, timeout=GENERATION_TIMEOUT)
+            )
+        return await client.post(url, json=payload)
+    
+    async def _generate_one(self, client: Optional["httpx.AsyncClient"], semaphore: asyncio.Semaphore,
+                            limiter: Optional[_TokenBucket], i: int, prompt: str,
+                            options: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate one image, turning any failure into a failed result"""
+        async with semaphore:
+            # Take the token inside the semaphore so the rate applies to requests actually sent
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                response = await self._post_generation(client, {"prompt": prompt, **options})
+                
+                if response.status_code < 400:
+                    return {
+                        "prompt": prompt,
+                        "url": _extract_url(response.content),
+                        "status": "success",
+                        "index": i,
+                        "timestamp": time.time()
+                    }
+                
+                return {
+                    "prompt": prompt,
+                    "url": None,
+                    "status": "failed",
+                    "error": f"HTTP {response.status_code}",
+                    "index": i,
+                    "timestamp": time.time()
+                }
+            
+            except Exception as e:
+                return {
+                    "prompt": prompt,
+                    "url": None,
+                    "status": "failed",
+                    "error": str(e),
+                    "index": i,
+                    "timestamp": time.time()
+                }
+    
+    async def process_batch(self, prompts: List[str], dedup: bool = True, **kwargs) -> List[Dict[str, Any]]:
         """Process multiple prompts in batch"""
         console.print(f"[bold cyan]Starting batch processing for {len(prompts)} prompts[/bold cyan]")
         
+        # Identical prompts share one generation (options are the same for the whole batch);
+        # pass dedup=False to get a separate sample for every repeat
+        index_map = defaultdict(list)
+        for i, prompt in enumerate(prompts):
+            index_map[prompt].append(i)
+        unique_prompts = list(index_map) if dedup else prompts
+        if len(unique_prompts) < len(prompts):
+            console.print(f"[cyan]Skipping {len(prompts) - len(unique_prompts)} duplicate prompts[/cyan]")
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -33,84 +223,81 @@ class BatchProcessor:
             TimeElapsedColumn(),
             console=console,
         ) as progress:
-            task = progress.add_task("Processing batch...", total=len(prompts))
+            task = progress.add_task("Processing batch...", total=len(unique_prompts))
             
-            for i, prompt in enumerate(prompts):
-                progress.update(task, advance=1, description=f"Processing: {prompt[:50]}...")
-                
-                try:
-                    # Make API request
-                    response = requests.post(
-                        f"{self.api_base}/v1/image/generations",
-                        json={"prompt": prompt, **kwargs},
-                        timeout=120
-                    )
-                    
-                    if response.ok:
-                        data = response.json()
-                        image_url = data["data"][0]["url"]
-                        
-                        result = {
-                            "prompt": prompt,
-                            "url": image_url,
-                            "status": "success",
-                            "index": i,
-                            "timestamp": time.time()
-                        }
-                        
-                        self.results.append(result)
-                        progress.update(task, description=f"✅ Success: {prompt[:30]}...")
-                        
-                    else:
-                        error_result = {
-                            "prompt": prompt,
-                            "url": None,
-                            "status": "failed",
-                            "error": f"HTTP {response.status_code}",
-                            "index": i,
-                            "timestamp": time.time()
-                        }
-                        
-                        self.results.append(error_result)
-                        progress.update(task, description=f"❌ Failed: {prompt[:30]}...")
-                
-                except Exception as e:
-                    error_result = {
-                        "prompt": prompt,
-                        "url": None,
-                        "status": "failed",
-                        "error": str(e),
-                        "index": i,
-                        "timestamp": time.time()
-                    }
-                    
-                    self.results.append(error_result)
-                    progress.update(task, description=f"❌ Error: {prompt[:30]}...")
-                
-                # Small delay between requests
-                await asyncio.sleep(1)
+            semaphore = asyncio.Semaphore(self.concurrency)
+            limiter = _TokenBucket(self.rate_limit) if self.rate_limit else None
+            client = self._create_client(self.concurrency, GENERATION_TIMEOUT)
+            
+            completed = 0
+            
+            async def _one(i: int, prompt: str) -> Dict[str, Any]:
+                nonlocal completed
+                result = await self._generate_one(client, semaphore, limiter, i, prompt, kwargs)
+                completed += 1
+                # Every update re-renders the progress region, so only refresh the text periodically
+                if completed % PROGRESS_DESCRIPTION_EVERY == 1 or completed == len(unique_prompts):
+                    template = _SUCCESS_DESCRIPTION if result["status"] == "success" else _FAILED_DESCRIPTION
+                    progress.update(task, advance=1, description=template.format(prompt[:30]))
+                else:
+                    progress.update(task, advance=1)
+                return result
+            
+            # The semaphore bounds concurrency and the token bucket bounds the request rate
+            try:
+                batch_results = await asyncio.gather(*(_one(i, prompt) for i, prompt in enumerate(unique_prompts)))
+            finally:
+                if client is not None:
+                    await client.aclose()
+            
+            if dedup:
+                # Fan each result back out to every position its prompt held, in the original order
+                expanded = [None] * len(prompts)
+                for result in batch_results:
+                    for i in index_map[result["prompt"]]:
+                        expanded[i] = {**result, "index": i}
+                batch_results = expanded
+            
+            self.results.extend(batch_results)
         
         return self.results
     
-    def save_results(self, filename: str = None) -> str:
-        """Save batch results to file"""
+    async def save_results(self, filename: str = None) -> str:
+        """Save batch results to file without blocking the event loop"""
         if filename is None:
             timestamp = int(time.time())
             filename = f"batch_results_{timestamp}.json"
         
-        with open(filename, 'w') as f:
-            json.dump(self.results, f, indent=2)
+        # Serializing and writing a large batch can take a while, so both run on a worker thread
+        await asyncio.get_running_loop().run_in_executor(None, self._write_results, filename)
         
         console.print(f"[green]✅ Results saved to {filename}[/green]")
         return filename
     
+    def _write_results(self, filename: str):
+        """Serialize the results and write them to disk"""
+        with open(filename, 'wb') as f:
+            f.write(_dumps(self.results))
+    
     def display_results(self):
         """Display batch results in a nice table"""
         if not self.results:
             console.print("[yellow]No results to display[/yellow]")
             return
         
-        success_count = len([r for r in self.results if r["status"] == "success"])
+        # Tally and format rows in a single pass over the results
+        success_count = 0
+        rows = []
+        for result in self.results:
+            success = result["status"] == "success"
+            success_count += success
+            rows.append((
+                str(result["index"]),
+                "✅" if success else "❌",
+                _short(result["prompt"], 40),
+                _short(result["url"], 30),
+                _short(result.get("error"), 20, "")
+            ))
         failed_count = len(self.results) - success_count
         
         # Summary
@@ -131,31 +318,48 @@ class BatchProcessor:
         table.add_column("URL", style="blue", width=30)
         table.add_column("Error", style="red", width=20)
         
-        for result in self.results:
-            status_icon = "✅" if result["status"] == "success" else "❌"
-            url_short = result["url"][:30] + "..." if result["url"] and len(result["url"]) > 30 else result["url"] or "N/A"
-            error_text = result.get("error", "")[:20] if result.get("error") else ""
-            
-            table.add_row(
-                str(result["index"]),
-                status_icon,
-                result["prompt"][:40] + "..." if len(result["prompt"]) > 40 else result["prompt"],
-                url_short,
-                error_text
-            )
+        for row in rows:
+            table.add_row(*row)
         
         console.print(table)
     
-    def download_images(self, output_dir: str = "batch_output"):
-        """Download all successful images"""
-        Path(output_dir).mkdir(exist_ok=True)
-        
+    def _download_to(self, url: str, filepath: Path):
+        """Stream one image to disk over the pooled session"""
+        with self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            with open(filepath, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+    
+    async def _download_one(self, client: Optional["httpx.AsyncClient"], url: str, filepath: Path):
+        """Stream one image to disk without blocking the event loop"""
+        try:
+            if client is None:
+                return await asyncio.get_running_loop().run_in_executor(None, self._download_to, url, filepath)
+            
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                async with aiofiles.open(filepath, 'wb') as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        await f.write(chunk)
+        except BaseException:
+            # Don't leave a truncated image behind when the download fails or is cancelled mid-stream
+            if filepath.exists():
+                filepath.unlink()
+            raise
+    
+    async def download_images(self, output_dir: str = "batch_output", concurrency: int = DOWNLOAD_CONCURRENCY):
+        """Download all successful images concurrently"""
         successful_results = [r for r in self.results if r["status"] == "success"]
         
         if not successful_results:
             console.print("[yellow]No successful images to download[/yellow]")
             return
         
+        # Resolve the output directory once for every download
+        out_root = Path(output_dir)
+        out_root.mkdir(parents=True, exist_ok=True)
+        
         console.print(f"[cyan]Downloading {len(successful_results)} images to {output_dir}/[/cyan]")
         
         with Progress(
@@ -167,23 +371,29 @@ class BatchProcessor:
         ) as progress:
             task = progress.add_task("Downloading images...", total=len(successful_results))
             
-            for i, result in enumerate(successful_results):
-                try:
-                    progress.update(task, advance=1, description=f"Downloading image {i+1}...")
-                    
-                    response = requests.get(result["url"], timeout=30)
-                    response.raise_for_status()
-                    
-                    # Generate filename
-                    prompt_clean = "".join(c for c in result["prompt"][:30] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                    filename = f"{i+1:03d}_{prompt_clean}.jpg"
-                    filepath = Path(output_dir) / filename
-                    
-                    with open(filepath, 'wb') as f:
-                        f.write(response.content)
+            semaphore = asyncio.Semaphore(concurrency)
+            client = self._create_client(concurrency, DOWNLOAD_TIMEOUT)
+            
+            async def _dl(i: int, result: Dict[str, Any]):
+                async with semaphore:
+                    try:
+                        # Generate filename
+                        prompt_clean = _FILENAME_UNSAFE.sub("", result["prompt"][:30]).rstrip()
+                        filename = f"{i+1:03d}_{prompt_clean}.jpg"
+                        filepath = out_root / filename
+                        
+                        await self._download_one(client, result["url"], filepath)
+                        
+                    except Exception as e:
+                        console.print(f"[red]Failed to download image {i+1}: {e}[/red]")
                     
-                except Exception as e:
-                    console.print(f"[red]Failed to download image {i+1}: {e}[/red]")
+                    progress.update(task, advance=1, description=f"Downloaded image {i+1}...")
+            
+            try:
+                await asyncio.gather(*(_dl(i, result) for i, result in enumerate(successful_results)))
+            finally:
+                if client is not None:
+                    await client.aclose()
         
         console.print(f"[green]✅ Images downloaded to {output_dir}/[/green]")
 
@@ -191,7 +401,8 @@ def load_prompts_from_file(filename: str) -> List[str]:
     """Load prompts from a text file"""
     try:
         with open(filename, 'r', encoding='utf-8') as f:
-            prompts = [line.strip() for line in f.readlines() if line.strip()]
+            # One pass over the file: strip each line once and keep the non-empty ones
+            prompts = [line for line in (raw.strip() for raw in f) if line]
         
         console.print(f"[green]✅ Loaded {len(prompts)} prompts from {filename}[/green]")
         return prompts
@@ -225,6 +436,25 @@ def create_sample_prompts_file():
     console.print(f"[green]✅ Created sample prompts file: {filename}[/green]")
     return filename
 
+def read_manual_prompts() -> List[str]:
+    """Read prompts one per line until an empty line or end of input"""
+    prompts = []
+    if sys.stdin.isatty():
+        while True:
+            prompt = input("Prompt: ").strip()
+            if not prompt:
+                break
+            prompts.append(prompt)
+        return prompts
+    
+    # Piped or pasted input: consume buffered lines directly instead of prompting per line
+    for line in sys.stdin:
+        prompt = line.strip()
+        if not prompt:
+            break
+        prompts.append(prompt)
+    return prompts
+
 async def main():
     """Main function for batch processing"""
     banner = Panel(
@@ -235,15 +465,13 @@ async def main():
     )
     console.print(banner)
     
+    processor = BatchProcessor()
+    
     # Check server status
-    try:
-        response = requests.get("http://127.0.0.1:10000/health", timeout=5)
-        if not response.ok:
-            raise Exception("Server not responding")
-        console.print("[green]✅ Server is running[/green]")
-    except Exception:
+    if not await processor.check_health():
         console.print("[red]❌ Server not running. Please start with: python main.py[/red]")
         return
+    console.print("[green]✅ Server is running[/green]")
     
     # Get prompts
     console.print("\n[bold cyan]Choose input method:[/bold cyan]")
@@ -263,11 +491,7 @@ async def main():
         prompts = load_prompts_from_file(filename)
     elif choice == "3":
         console.print("Enter prompts (one per line, empty line to finish):")
-        while True:
-            prompt = input("Prompt: ").strip()
-            if not prompt:
-                break
-            prompts.append(prompt)
+        prompts = read_manual_prompts()
     else:
         console.print("[red]Invalid choice[/red]")
         return
@@ -281,7 +505,6 @@ async def main():
     resolution_choice = input("Resolution (512x512/1024x1024/2048x2048) [1024x1024]: ").strip() or "1024x1024"
     
     # Process batch
-    processor = BatchProcessor()
     results = await processor.process_batch(
         prompts,
         format=format_choice,
@@ -294,12 +517,12 @@ async def main():
     # Save results
     save_choice = input("\nSave results to file? (y/n) [y]: ").strip().lower()
     if save_choice != 'n':
-        processor.save_results()
+        await processor.save_results()
     
     # Download images
     download_choice = input("Download successful images? (y/n) [y]: ").strip().lower()
     if download_choice != 'n':
-        processor.download_images()
+        await processor.download_images()
     
     console.print("\n[bold green]🎉 Batch processing completed![/bold green]")
 
@@ -5,38 +5,147 @@ Caching system for Nano Banana Image Generator
 
 import os
 import json
+import mmap
 import time
+import atexit
 import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 import shutil
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 console = Console()
 
+# Seconds to wait before writing the index after an access-time update, so bursts of hits share one write
+INDEX_FLUSH_DELAY = 0.5
+
+# Distinct (prompt, format, resolution, quality) keys remembered by _cache_key
+KEY_CACHE_SIZE = 4096
+
+# Encoded results kept in memory in front of the heap; every hit decodes a fresh copy
+RESULT_MEMO_SIZE = 128
+
+# Append-only file holding every cached result, addressed by the offset and size recorded in the index
+HEAP_FILE_NAME = "cache_heap.bin"
+
+# The heap is compacted once dead bytes (overwritten or evicted results) pass this floor and half its size;
+# dead bytes still count toward max_size_mb, so an over-limit cache is compacted regardless
+HEAP_COMPACT_MIN_BYTES = 1024 * 1024
+
+# Seconds allowed for one image download
+DOWNLOAD_TIMEOUT = 30
+
+# Buffer size used when copying downloaded images to disk
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+
+# Image downloads run at once by download_many; must not exceed the session's pool size
+DOWNLOAD_WORKERS = 8
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+def _dumps(data: Any) -> bytes:
+    """Serialize data as compact JSON bytes, keeping key order"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _pack_result(result: Any) -> Tuple[bytes, str]:
+    """Encode a cached result, preferring msgpack, and name the encoding used"""
+    if msgpack is not None:
+        return msgpack.packb(result, use_bin_type=True), "msgpack"
+    return _dumps(result), "json"
+
+def _unpack_result(data: bytes, encoding: str) -> Any:
+    """Decode a cached result written by _pack_result"""
+    if encoding == "msgpack":
+        return msgpack.unpackb(data, raw=False)
+    return _loads(data)
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def _cache_key(prompt: str, fmt: str, resolution: str, quality: str) -> str:
+    """Hash a prompt and its parameters into a 32-character hex cache key"""
+    return hashlib.blake2b(f"{prompt}|{fmt}|{resolution}|{quality}".encode(), digest_size=16).hexdigest()
+
 class CacheManager:
     def __init__(self, cache_dir: str = "cache", max_size_mb: int = 500):
         self.cache_dir = Path(cache_dir)
         self.max_size_mb = max_size_mb
         self.index_file = self.cache_dir / "cache_index.json"
+        self.heap_file = self.cache_dir / HEAP_FILE_NAME
         self.cache_index = self._load_index()
         
+        # Append handle and read-only map of the heap, both opened on first use
+        self._heap = None
+        self._heap_map = None
+        
+        # Recently used results, least recently used first, so repeat hits skip the heap
+        self._memo = OrderedDict()
+        
+        # Index writes are debounced; anything still pending is written at exit
+        self._dirty = False
+        self._flush_timer = None
+        self._flush_lock = threading.Lock()
+        atexit.register(self._flush_index_now)
+        
+        # Pooled session so repeated image downloads reuse their connection
+        self._session = self._create_session()
+        
+        # Guards index bookkeeping when images download on worker threads
+        self._index_lock = threading.Lock()
+        
         # Ensure cache directory exists
         self.cache_dir.mkdir(exist_ok=True)
+        
+        # Scan the directory once at startup; afterwards writes and unlinks keep the total current
+        self.recalculate_cache_size()
+    
+    def _create_session(self) -> requests.Session:
+        """Create a pooled HTTP session shared by all image downloads"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
     
     def _load_index(self) -> Dict[str, Any]:
         """Load cache index from file"""
         if self.index_file.exists():
             try:
-                with open(self.index_file, 'r') as f:
-                    return json.load(f)
+                index = _loads(self.index_file.read_bytes())
+                
+                # Entries are kept least recently used first, so eviction pops from the front
+                index["entries"] = OrderedDict(
+                    sorted(index["entries"].items(), key=lambda item: item[1].get("last_accessed", 0))
+                )
+                return index
             except Exception as e:
                 console.print(f"[yellow]Warning: Could not load cache index: {e}[/yellow]")
         
         return {
-            "entries": {},
+            "entries": OrderedDict(),
             "metadata": {
                 "created": time.time(),
                 "last_cleanup": time.time(),
@@ -44,108 +153,294 @@ class CacheManager:
             }
         }
     
-    def _save_index(self):
-        """Save cache index to file"""
-        try:
-            with open(self.index_file, 'w') as f:
-                json.dump(self.cache_index, f, indent=2)
-        except Exception as e:
-            console.print(f"[red]Error saving cache index: {e}[/red]")
+    def _save_index(self, immediate: bool = False):
+        """Mark the cache index as changed and write it now or after INDEX_FLUSH_DELAY"""
+        with self._flush_lock:
+            self._dirty = True
+            if not immediate and self._flush_timer is None:
+                self._flush_timer = threading.Timer(INDEX_FLUSH_DELAY, self._flush_index_now)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        
+        if immediate:
+            self._flush_index_now()
+    
+    def _flush_index_now(self):
+        """Write the cache index to file if it has unsaved changes"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            
+            # Write a temp file and swap it in, so a crash never leaves a truncated index
+            tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+            try:
+                tmp_file.write_bytes(_dumps(self.cache_index))
+                os.replace(tmp_file, self.index_file)
+                self._dirty = False
+            except Exception as e:
+                console.print(f"[red]Error saving cache index: {e}[/red]")
     
     def _generate_key(self, prompt: str, **kwargs) -> str:
         """Generate cache key from prompt and parameters"""
-        # Create a hash from prompt and parameters
+        return _cache_key(prompt, kwargs.get('format', 'jpg'), kwargs.get('resolution', '1024x1024'),
+                          kwargs.get('quality', 'high'))
+    
+    def _legacy_key(self, prompt: str, **kwargs) -> str:
+        """Generate the MD5 cache key used by older caches"""
         content = f"{prompt}|{kwargs.get('format', 'jpg')}|{kwargs.get('resolution', '1024x1024')}|{kwargs.get('quality', 'high')}"
         return hashlib.md5(content.encode()).hexdigest()
     
+    def _resolve_key(self, prompt: str, **kwargs) -> str:
+        """Generate the cache key, moving an entry stored under its legacy MD5 key over to it"""
+        key = self._generate_key(prompt, **kwargs)
+        entries = self.cache_index["entries"]
+        if key in entries or not entries:
+            return key
+        
+        legacy_key = self._legacy_key(prompt, **kwargs)
+        entry = entries.pop(legacy_key, None)
+        if entry is not None:
+            extension = entry.get("extension", "jpg")
+            renames = [
+                (self._get_cache_path(legacy_key), self._get_cache_path(key)),
+                (self._get_image_path(legacy_key, extension), self._get_image_path(key, extension)),
+            ]
+            for old_path, new_path in renames:
+                try:
+                    os.replace(old_path, new_path)
+                except FileNotFoundError:
+                    pass
+            entries[key] = entry
+            self._save_index()
+        return key
+    
     def _get_cache_path(self, key: str) -> Path:
-        """Get file path for cache entry"""
+        """Get the per-entry result file used by older caches"""
         return self.cache_dir / f"{key}.json"
     
+    def _append_result(self, data: bytes) -> int:
+        """Append an encoded result to the heap, returning its offset"""
+        if self._heap is None:
+            self._heap = open(self.heap_file, 'ab')
+        offset = self._heap.tell()
+        self._heap.write(data)
+        # Flush so the map sees the record as soon as it is remapped
+        self._heap.flush()
+        self._heap_size = offset + len(data)
+        return offset
+    
+    def _read_result(self, offset: int, size: int) -> bytes:
+        """Read an encoded result from the memory-mapped heap"""
+        end = offset + size
+        if self._heap_map is None or len(self._heap_map) < end:
+            # The heap has grown past the current map, so map it again at its new length
+            if self._heap_map is not None:
+                self._heap_map.close()
+            with open(self.heap_file, 'rb') as f:
+                self._heap_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._heap_map[offset:end]
+    
+    def _close_heap(self):
+        """Close the heap's append handle and map so the file can be replaced or removed"""
+        if self._heap_map is not None:
+            self._heap_map.close()
+            self._heap_map = None
+        if self._heap is not None:
+            self._heap.close()
+            self._heap = None
+    
+    def _compact_heap(self):
+        """Rewrite the heap with only the live results, in LRU order"""
+        self._close_heap()
+        
+        tmp_file = self.heap_file.with_name(self.heap_file.name + ".tmp")
+        offsets = {}
+        with open(self.heap_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+            for key, entry in self.cache_index["entries"].items():
+                if "offset" in entry:
+                    src.seek(entry["offset"])
+                    offsets[key] = dst.tell()
+                    dst.write(src.read(entry["size_bytes"]))
+            heap_size = dst.tell()
+        os.replace(tmp_file, self.heap_file)
+        
+        for key, offset in offsets.items():
+            self.cache_index["entries"][key]["offset"] = offset
+        self._heap_size = heap_size
+        self._heap_dead = 0
+        self._save_index(immediate=True)
+    
+    def _maybe_compact_heap(self):
+        """Compact the heap when dead results take up more than half of it"""
+        if self._heap_dead > HEAP_COMPACT_MIN_BYTES and self._heap_dead * 2 > self._heap_size:
+            self._compact_heap()
+    
+    def _migrate_result_file(self, key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Move a result stored in its own JSON file by an older cache into the heap"""
+        cache_file = self._get_cache_path(key)
+        previous_size = self._recorded_size(entry, "size_bytes", cache_file)
+        result = _loads(cache_file.read_bytes())
+        
+        data, entry["encoding"] = _pack_result(result)
+        entry["offset"] = self._append_result(data)
+        entry["size_bytes"] = len(data)
+        cache_file.unlink()
+        self._add_bytes(len(data) - previous_size)
+        return result
+    
     def _get_image_path(self, key: str, extension: str = "jpg") -> Path:
         """Get image file path for cache entry"""
         return self.cache_dir / f"{key}.{extension}"
     
     def _get_cache_size(self) -> int:
-        """Get total cache size in bytes"""
+        """Scan the cache directory for the total size of cached files in bytes"""
+        # scandir entries carry the file type from the directory read, so only sizes need a stat
         total_size = 0
-        for file_path in self.cache_dir.glob("*"):
-            if file_path.is_file():
-                total_size += file_path.stat().st_size
+        with os.scandir(self.cache_dir) as it:
+            for dir_entry in it:
+                if dir_entry.is_file(follow_symlinks=False) and dir_entry.name != self.index_file.name:
+                    total_size += dir_entry.stat(follow_symlinks=False).st_size
         return total_size
     
-    def _get_cache_size_mb(self) -> float:
-        """Get total cache size in MB"""
-        return self._get_cache_size() / (1024 * 1024)
+    def recalculate_cache_size(self) -> int:
+        """Recount the cache size from disk, replacing the running total; returns the size in bytes"""
+        # Record image sizes for entries cached before they were tracked, so stats never need to stat
+        backfilled = False
+        for key, entry in self.cache_index["entries"].items():
+            if "image_size_bytes" not in entry:
+                image_file = self._get_image_path(key, entry.get("extension", "jpg"))
+                if image_file.exists():
+                    entry["image_size_bytes"] = image_file.stat().st_size
+                    backfilled = True
+        if backfilled:
+            self._save_index()
+        
+        # Heap bytes no longer referenced by any entry count as dead until the next compaction
+        live_heap_bytes = sum(e["size_bytes"] for e in self.cache_index["entries"].values() if "offset" in e)
+        self._heap_size = self.heap_file.stat().st_size if self.heap_file.exists() else 0
+        self._heap_dead = max(self._heap_size - live_heap_bytes, 0)
+        
+        self._total_bytes = self._get_cache_size() - self._heap_dead
+        self.cache_index["metadata"]["total_size_bytes"] = self._total_bytes
+        return self._total_bytes
+    
+    @property
+    def cache_size_mb(self) -> float:
+        """Total cache size in MB, from the running byte count"""
+        return self._total_bytes / (1024 * 1024)
+    
+    def _add_bytes(self, size: int):
+        """Adjust the running cache size and mirror it into the index metadata"""
+        self._total_bytes = max(self._total_bytes + size, 0)
+        self.cache_index["metadata"]["total_size_bytes"] = self._total_bytes
+    
+    def _recorded_size(self, entry: Dict[str, Any], field: str, file_path: Path) -> int:
+        """Size of an entry file as recorded in the index, falling back to stat for older entries"""
+        if field in entry:
+            return entry[field]
+        return file_path.stat().st_size if file_path.exists() else 0
+    
+    def _remember(self, key: str, data: bytes, encoding: str):
+        """Keep an encoded result in the in-memory LRU, evicting the oldest past RESULT_MEMO_SIZE"""
+        # Bytes rather than the dict, so callers can never mutate what later hits return
+        self._memo[key] = (data, encoding)
+        self._memo.move_to_end(key)
+        if len(self._memo) > RESULT_MEMO_SIZE:
+            self._memo.popitem(last=False)
+    
+    def _unlink_entry(self, key: str, entry: Dict[str, Any]) -> int:
+        """Delete an entry's result and image files, returning the bytes freed for the caller to subtract"""
+        self._memo.pop(key, None)
+        freed = 0
+        files = [(self._get_image_path(key, entry.get("extension", "jpg")), "image_size_bytes")]
+        if "offset" in entry:
+            # Heap results stay on disk as dead bytes until the next compaction
+            freed += entry["size_bytes"]
+            self._heap_dead += entry["size_bytes"]
+        else:
+            files.append((self._get_cache_path(key), "size_bytes"))
+        
+        for file_path, field in files:
+            size = self._recorded_size(entry, field, file_path)
+            try:
+                os.unlink(file_path)
+                freed += size
+            except FileNotFoundError:
+                pass
+        
+        return freed
     
     def _cleanup_cache(self):
         """Clean up cache if it exceeds max size"""
-        current_size_mb = self._get_cache_size_mb()
+        limit_bytes = self.max_size_mb * 1024 * 1024
+        # Dead heap bytes are not part of the cache size but still take up disk, so they count here
+        disk_size_mb = (self._total_bytes + self._heap_dead) / (1024 * 1024)
         
-        if current_size_mb > self.max_size_mb:
-            console.print(f"[yellow]Cache size ({current_size_mb:.1f}MB) exceeds limit ({self.max_size_mb}MB). Cleaning up...[/yellow]")
+        if disk_size_mb > self.max_size_mb:
+            console.print(f"[yellow]Cache size ({disk_size_mb:.1f}MB) exceeds limit ({self.max_size_mb}MB). Cleaning up...[/yellow]")
             
-            # Sort entries by access time (oldest first)
-            entries = list(self.cache_index["entries"].items())
-            entries.sort(key=lambda x: x[1].get("last_accessed", 0))
-            
-            # Remove oldest entries until under limit
-            for key, entry in entries:
-                if current_size_mb <= self.max_size_mb * 0.8:  # Clean to 80% of limit
-                    break
-                
-                # Remove files
-                cache_file = self._get_cache_path(key)
-                image_file = self._get_image_path(key, entry.get("extension", "jpg"))
-                
-                for file_path in [cache_file, image_file]:
-                    if file_path.exists():
-                        file_size = file_path.stat().st_size
-                        file_path.unlink()
-                        current_size_mb -= file_size / (1024 * 1024)
-                
-                # Remove from index
-                del self.cache_index["entries"][key]
+            # Evict only when live entries alone are over the limit: pop least recently used until under 80%
+            if self._total_bytes > limit_bytes:
+                entries = self.cache_index["entries"]
+                target_bytes = self.max_size_mb * 0.8 * 1024 * 1024
+                freed = 0
+                while entries and self._total_bytes - freed > target_bytes:
+                    key, entry = entries.popitem(last=False)
+                    freed += self._unlink_entry(key, entry)
+                self._add_bytes(-freed)
+            current_size_mb = self.cache_size_mb
             
             # Update metadata
             self.cache_index["metadata"]["last_cleanup"] = time.time()
-            self.cache_index["metadata"]["total_size_bytes"] = self._get_cache_size()
-            self._save_index()
+            self._save_index(immediate=True)
+            # Reclaim dead results, including any just evicted, so the disk footprint drops below the limit
+            if self._heap_dead:
+                self._compact_heap()
             
             console.print(f"[green]Cache cleanup completed. New size: {current_size_mb:.1f}MB[/green]")
     
     def get(self, prompt: str, **kwargs) -> Optional[Dict[str, Any]]:
         """Get cached result for prompt"""
-        key = self._generate_key(prompt, **kwargs)
+        key = self._resolve_key(prompt, **kwargs)
         
         if key in self.cache_index["entries"]:
             entry = self.cache_index["entries"][key]
-            cache_file = self._get_cache_path(key)
             
-            if cache_file.exists():
-                try:
-                    with open(cache_file, 'r') as f:
-                        cached_data = json.load(f)
-                    
-                    # Update access time
-                    entry["last_accessed"] = time.time()
-                    self.cache_index["entries"][key] = entry
-                    self._save_index()
-                    
-                    console.print(f"[green]✅ Cache hit for prompt: {prompt[:50]}...[/green]")
-                    return cached_data
-                    
-                except Exception as e:
-                    console.print(f"[yellow]Warning: Could not read cache file: {e}[/yellow]")
-                    # Remove invalid entry
-                    del self.cache_index["entries"][key]
-                    self._save_index()
+            try:
+                if key in self._memo:
+                    data, encoding = self._memo[key]
+                    self._memo.move_to_end(key)
+                    cached_data = _unpack_result(data, encoding)
+                elif "offset" in entry:
+                    data = self._read_result(entry["offset"], entry["size_bytes"])
+                    cached_data = _unpack_result(data, entry.get("encoding", "json"))
+                    self._remember(key, data, entry.get("encoding", "json"))
+                else:
+                    cached_data = self._migrate_result_file(key, entry)
+                
+                # Update access time and mark as most recently used
+                entry["last_accessed"] = time.time()
+                self.cache_index["entries"].move_to_end(key)
+                self._save_index()
+                
+                console.print(f"[green]✅ Cache hit for prompt: {prompt[:50]}...[/green]")
+                return cached_data
+                
+            except Exception as e:
+                console.print(f"[yellow]Warning: Could not read cached result: {e}[/yellow]")
+                # Remove invalid entry
+                self._add_bytes(-self._unlink_entry(key, entry))
+                del self.cache_index["entries"][key]
+                self._save_index()
         
         return None
     
     def set(self, prompt: str, result: Dict[str, Any], **kwargs):
         """Cache result for prompt"""
-        key = self._generate_key(prompt, **kwargs)
+        key = self._resolve_key(prompt, **kwargs)
         
         # Prepare cache entry
         entry = {
@@ -160,27 +455,49 @@ class CacheManager:
         # Save cache data
         cache_file = self._get_cache_path(key)
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(result, f, indent=2)
+            # Overwriting an entry replaces its result but keeps any cached image
+            previous = self.cache_index["entries"].get(key)
+            previous_size = self._recorded_size(previous, "size_bytes", cache_file) if previous else 0
+            
+            data, encoding = _pack_result(result)
+            offset = self._append_result(data)
+            size = len(data)
+            
+            if previous and "offset" in previous:
+                self._heap_dead += previous_size
+            elif previous:
+                cache_file.unlink(missing_ok=True)
             
             # Update index
+            entry["offset"] = offset
+            entry["size_bytes"] = size
+            entry["encoding"] = encoding
+            if previous and "image_size_bytes" in previous:
+                entry["image_size_bytes"] = previous["image_size_bytes"]
+            elif not previous:
+                # An image downloaded before its result was cached has no entry to record its size yet
+                image_file = self._get_image_path(key, entry["extension"])
+                if image_file.exists():
+                    entry["image_size_bytes"] = image_file.stat().st_size
             self.cache_index["entries"][key] = entry
-            self.cache_index["metadata"]["total_size_bytes"] = self._get_cache_size()
-            self._save_index()
+            self.cache_index["entries"].move_to_end(key)
+            self._remember(key, data, encoding)
+            self._add_bytes(size - previous_size)
+            self._save_index(immediate=True)
             
             console.print(f"[green]✅ Cached result for prompt: {prompt[:50]}...[/green]")
             
             # Check if cleanup is needed
             self._cleanup_cache()
+            self._maybe_compact_heap()
             
         except Exception as e:
             console.print(f"[red]Error caching result: {e}[/red]")
     
     def download_and_cache_image(self, image_url: str, prompt: str, **kwargs) -> Optional[str]:
         """Download image and cache it locally"""
-        import requests
-        
-        key = self._generate_key(prompt, **kwargs)
+        with self._index_lock:
+            key = self._resolve_key(prompt, **kwargs)
         extension = kwargs.get("format", "jpg")
         image_file = self._get_image_path(key, extension)
         
@@ -189,23 +506,50 @@ class CacheManager:
             return str(image_file)
         
         try:
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
+            # Stream to disk so the whole image is never held in memory
+            with self._session.get(image_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                # Copy straight from the socket so no intermediate chunk objects are built
+                response.raw.decode_content = True
+                with open(image_file, 'wb', buffering=DOWNLOAD_BUFFER_SIZE) as f:
+                    shutil.copyfileobj(response.raw, f, length=DOWNLOAD_BUFFER_SIZE)
+                    size = f.tell()
             
-            with open(image_file, 'wb') as f:
-                f.write(response.content)
+            # Record the image size so eviction never has to stat it
+            with self._index_lock:
+                self._add_bytes(size)
+                if key in self.cache_index["entries"]:
+                    self.cache_index["entries"][key]["image_size_bytes"] = size
+                    self._save_index()
             
             console.print(f"[green]✅ Downloaded and cached image: {image_file.name}[/green]")
             return str(image_file)
             
         except Exception as e:
+            # Drop a partial download so it is not mistaken for a cached image
+            image_file.unlink(missing_ok=True)
             console.print(f"[red]Error downloading image: {e}[/red]")
             return None
     
+    def download_many(self, items: List[Dict[str, Any]], workers: int = DOWNLOAD_WORKERS) -> List[Optional[str]]:
+        """Download and cache several images concurrently, returning their paths in input order"""
+        # Items that map to the same cache key share one download
+        keys = [self._generate_key(item["prompt"], **item.get("kwargs", {})) for item in items]
+        unique = {}
+        for key, item in zip(keys, items):
+            unique.setdefault(key, item)
+        
+        def _download(item: Dict[str, Any]) -> Optional[str]:
+            return self.download_and_cache_image(item["url"], item["prompt"], **item.get("kwargs", {}))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            paths = dict(zip(unique, executor.map(_download, unique.values())))
+        return [paths[key] for key in keys]
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         entries = self.cache_index["entries"]
-        total_size_mb = self._get_cache_size_mb()
+        total_size_mb = self.cache_size_mb
         
         # Calculate age statistics
         now = time.time()
@@ -226,8 +570,10 @@ class CacheManager:
         
         return stats
     
-    def display_stats(self):
-        """Display cache statistics in a nice table"""
+    def display_stats(self, recount: bool = False):
+        """Display cache statistics in a nice table, optionally recounting the size from disk first"""
+        if recount:
+            self.recalculate_cache_size()
         stats = self.get_cache_stats()
         
         # Summary panel
@@ -251,22 +597,20 @@ class CacheManager:
             table.add_column("Age (h)", style="blue", width=10)
             table.add_column("Size (KB)", style="red", width=12)
             
-            entries = self.cache_index["entries"]
-            for key, entry in entries.items():
-                # Get file size
-                image_file = self._get_image_path(key, entry.get("extension", "jpg"))
-                file_size_kb = round(image_file.stat().st_size / 1024, 1) if image_file.exists() else 0
-                
-                # Calculate age
-                age_hours = round((time.time() - entry["created"]) / 3600, 1)
-                
-                table.add_row(
+            # Sizes come from the index, so building rows needs no filesystem calls
+            now = time.time()
+            rows = [
+                (
                     entry["prompt"][:40] + "..." if len(entry["prompt"]) > 40 else entry["prompt"],
                     entry.get("extension", "jpg").upper(),
                     entry.get("resolution", "1024x1024"),
-                    str(age_hours),
-                    str(file_size_kb)
+                    str(round((now - entry["created"]) / 3600, 1)),
+                    str(round(entry.get("image_size_bytes", 0) / 1024, 1))
                 )
+                for entry in self.cache_index["entries"].values()
+            ]
+            for row in rows:
+                table.add_row(*row)
             
             console.print(table)
     
@@ -279,48 +623,48 @@ class CacheManager:
                 console.print("[yellow]Cache clear cancelled[/yellow]")
                 return
         
-        # Remove all files
-        for file_path in self.cache_dir.glob("*"):
-            if file_path.is_file() and file_path.name != "cache_index.json":
-                file_path.unlink()
+        # Remove all files, the heap included
+        self._close_heap()
+        with os.scandir(self.cache_dir) as it:
+            for dir_entry in it:
+                if dir_entry.is_file(follow_symlinks=False) and dir_entry.name != self.index_file.name:
+                    os.unlink(dir_entry.path)
         
         # Reset index
+        self._memo.clear()
+        self._total_bytes = 0
+        self._heap_size = 0
+        self._heap_dead = 0
         self.cache_index = {
-            "entries": {},
+            "entries": OrderedDict(),
             "metadata": {
                 "created": time.time(),
                 "last_cleanup": time.time(),
                 "total_size_bytes": 0
             }
         }
-        self._save_index()
+        self._save_index(immediate=True)
         
         console.print("[green]✅ Cache cleared successfully[/green]")
     
     def cleanup_old_entries(self, max_age_hours: int = 24):
         """Remove entries older than specified age"""
-        now = time.time()
-        max_age_seconds = max_age_hours * 3600
+        cutoff = time.time() - max_age_hours * 3600
+        entries = self.cache_index["entries"]
+        to_remove = [(key, entry) for key, entry in entries.items() if entry["created"] < cutoff]
         
-        removed_count = 0
-        for key, entry in list(self.cache_index["entries"].items()):
-            if now - entry["created"] > max_age_seconds:
-                # Remove files
-                cache_file = self._get_cache_path(key)
-                image_file = self._get_image_path(key, entry.get("extension", "jpg"))
-                
-                for file_path in [cache_file, image_file]:
-                    if file_path.exists():
-                        file_path.unlink()
-                
-                # Remove from index
-                del self.cache_index["entries"][key]
-                removed_count += 1
+        # Remove files and index entries in one pass, then adjust the size once
+        freed = 0
+        for key, entry in to_remove:
+            freed += self._unlink_entry(key, entry)
+            del entries[key]
+        self._add_bytes(-freed)
         
+        removed_count = len(to_remove)
         if removed_count > 0:
-            self.cache_index["metadata"]["total_size_bytes"] = self._get_cache_size()
             self.cache_index["metadata"]["last_cleanup"] = time.time()
-            self._save_index()
+            self._save_index(immediate=True)
+            self._maybe_compact_heap()
             console.print(f"[green]✅ Removed {removed_count} old cache entries[/green]")
         else:
             console.print("[yellow]No old entries to remove[/yellow]")
@@ -342,9 +686,10 @@ def main():
         console.print("1. View cache statistics")
         console.print("2. Clear all cache")
         console.print("3. Cleanup old entries")
-        console.print("4. Exit")
+        console.print("4. Recount cache size from disk")
+        console.print("5. Exit")
         
-        choice = input("\nEnter choice (1-4): ").strip()
+        choice = input("\nEnter choice (1-5): ").strip()
         
         if choice == "1":
             cache_manager.display_stats()
@@ -355,6 +700,8 @@ def main():
             max_age = int(age) if age.isdigit() else 24
             cache_manager.cleanup_old_entries(max_age)
         elif choice == "4":
+            cache_manager.display_stats(recount=True)
+        elif choice == "5":
             console.print("[green]Goodbye![/green]")
             break
         else:
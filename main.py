@@ -5,12 +5,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 import requests
+import asyncio
 import time
 import uuid
 import logging
 import io
 import os
 import json
+import base64
+from collections import deque
 
 # Configure logging with timestamps and structured format
 logging.basicConfig(
@@ -56,6 +59,14 @@ class BatchGenerationRequest(BaseModel):
     resolution: Optional[str] = "1024x1024"
     quality: Optional[str] = "high"
 
+class BatchEditOperation(BaseModel):
+    prompt: str
+    type: Optional[str] = None  # "style_transfer", "color_adjustment", "filter"
+
+class BatchEditRequest(BaseModel):
+    image_url: str
+    operations: List[BatchEditOperation]
+
 class HistoryItem(BaseModel):
     id: str
     type: str  # "create" or "edit"
@@ -82,6 +93,49 @@ gallery_items = []
 # Batch processing queue
 batch_queue = {}
 
+# Generation history is an append-only JSON Lines log, oldest item first
+HISTORY_FILE = "generation_history.jsonl"
+
+# Pre-JSONL history file (a newest-first JSON array), migrated on first use
+LEGACY_HISTORY_FILE = "generation_history.json"
+
+# Number of items returned by the history endpoint, and kept on disk after a compaction
+HISTORY_LIMIT = 100
+
+# Once the log passes this many lines it is rewritten with only the newest HISTORY_LIMIT items
+HISTORY_COMPACT_LINES = 2 * HISTORY_LIMIT
+
+# Lines currently in HISTORY_FILE; counted on the first append, then kept up to date
+_history_lines = None
+
+
+def migrate_legacy_history():
+    """Convert the legacy JSON array history into the JSONL log if it has not been done yet"""
+    if os.path.exists(HISTORY_FILE) or not os.path.exists(LEGACY_HISTORY_FILE):
+        return
+    
+    with open(LEGACY_HISTORY_FILE, 'r') as f:
+        history = json.load(f)
+    
+    with open(HISTORY_FILE, 'w') as f:
+        f.writelines(json.dumps(item) + "\n" for item in reversed(history))
+    
+    logger.info(f"Migrated {len(history)} history items to {HISTORY_FILE}")
+
+
+def compact_history() -> int:
+    """Rewrite the history log with only its newest HISTORY_LIMIT items; returns the lines kept"""
+    with open(HISTORY_FILE, 'r') as f:
+        lines = deque((line for line in f if line.strip()), maxlen=HISTORY_LIMIT)
+    
+    # Write a sibling file and swap it in, so readers never see a half-written log
+    tmp_file = HISTORY_FILE + ".tmp"
+    with open(tmp_file, 'w') as f:
+        f.writelines(lines)
+    os.replace(tmp_file, HISTORY_FILE)
+    
+    return len(lines)
+
 
 def upload_image_to_uguu(image_url: str) -> str:
     """Download image and upload to uguu.se"""
@@ -157,6 +211,31 @@ def upload_image_to_uguu(image_url: str) -> str:
         raise Exception(f"Failed to download or upload image: {e}")
 
 
+def resolve_image_url(image_url: str) -> str:
+    """Upload an inline base64 data URI so the provider receives a fetchable URL"""
+    if not image_url or not image_url.startswith("data:"):
+        return image_url
+    
+    header, encoded = image_url.split(",", 1)
+    content_type = header[len("data:"):].split(";")[0] or "image/jpeg"
+    content = base64.b64decode(encoded)
+    filename = f"inline_{int(time.time())}.{content_type.split('/')[-1]}"
+    
+    logger.info(f"⏳ Uploading inline image ({len(content)} bytes) to uguu.se as {filename}...")
+    
+    files = {"files[]": (filename, io.BytesIO(content), content_type)}
+    upload_response = requests.post("https://uguu.se/upload", files=files, timeout=30)
+    
+    if upload_response.status_code == 200:
+        data = upload_response.json()
+        if data.get("success") and data.get("files"):
+            url = data["files"][0].get("url")
+            if url:
+                return url
+    
+    raise Exception(f"Failed to upload inline image: HTTP {upload_response.status_code}")
+
+
 def generate_cookie():
     anon_user_id = str(uuid.uuid4())  # Generates a new unique ID
     current_timestamp = int(time.time())
@@ -191,7 +270,9 @@ class FallbackImageProvider:
 
 
 class VisualGPTProvider:
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
+        # Status polling reuses one pooled connection; submissions keep a fresh session per attempt
+        self.session = session or requests.Session()
         self.cookie_string = generate_cookie()
         self.headers_step1 = {
             "authority": "visualgpt.io",
@@ -366,7 +447,7 @@ class VisualGPTProvider:
                 headers = self.headers_step2.copy()
                 # update path header so it matches (optional but good replication)
                 headers["path"] = f"/api/v1/prediction/get-status?session_id={session_id}"
-                resp = requests.get(url, headers=headers, timeout=30)
+                resp = self.session.get(url, headers=headers, timeout=30)
                 
                 # Reset error counter on successful request
                 consecutive_errors = 0
@@ -465,8 +546,11 @@ class VisualGPTProvider:
     async def generate_image(self, prompt: str, image_url: str = None, task_id: str = None) -> str:
         """Generate an image and return the uploaded URL from uguu.se"""
         try:
-            # Use default URL if image_url is None or empty
-            starting_image = image_url if image_url and image_url.strip() else IMAGE_UPLOAD_URL
+            # Use default URL if image_url is None or empty; inline images are uploaded off the event loop
+            if image_url and image_url.strip():
+                starting_image = await asyncio.get_running_loop().run_in_executor(None, resolve_image_url, image_url)
+            else:
+                starting_image = IMAGE_UPLOAD_URL
             logger.info(f"Starting image generation for prompt: {prompt[:50]}... with starting_image: {starting_image}")
             
             # Update progress
@@ -909,42 +993,81 @@ async def batch_generate_images(request: BatchGenerationRequest):
         "results": results
     }
 
+@app.post("/v1/image/batch_edit",
+         summary="Batch Edit Image",
+         description="Apply a chain of edit operations to one image in a single request")
+async def batch_edit_image(request: BatchEditRequest):
+    """Apply edit operations in sequence, feeding each result into the next step"""
+    logger.info(f"Received batch edit request for {len(request.operations)} operations")
+    
+    results = []
+    current_url = request.image_url
+    for i, operation in enumerate(request.operations):
+        try:
+            logger.info(f"Processing edit step {i+1}/{len(request.operations)}: {operation.prompt[:50]}...")
+            current_url = await provider.generate_image(operation.prompt, current_url)
+            
+            results.append({
+                "url": current_url,
+                "status": "success",
+                "index": i
+            })
+            
+        except Exception as e:
+            logger.error(f"Edit step {i+1} failed: {e}")
+            results.append({
+                "url": None,
+                "status": "failed",
+                "error": str(e),
+                "index": i
+            })
+            break
+    
+    return {
+        "image_url": request.image_url,
+        "final_url": current_url,
+        "results": results
+    }
+
 @app.get("/v1/history", summary="Get Generation History", description="Get generation history")
 async def get_history():
     """Get generation history"""
-    history_file = "generation_history.json"
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r') as f:
-                history = json.load(f)
+    try:
+        migrate_legacy_history()
+        if os.path.exists(HISTORY_FILE):
+            with open(HISTORY_FILE, 'r') as f:
+                lines = deque((line for line in f if line.strip()), maxlen=HISTORY_LIMIT)
+            
+            # Newest first, as the endpoint has always returned
+            history = [json.loads(line) for line in reversed(lines)]
             return {"history": history}
-        except Exception as e:
-            logger.error(f"Error reading history: {e}")
-            return {"history": []}
+    except Exception as e:
+        logger.error(f"Error reading history: {e}")
+        return {"history": []}
     return {"history": []}
 
 @app.post("/v1/history", summary="Add to History", description="Add item to generation history")
 async def add_to_history(item: HistoryItem):
     """Add item to generation history"""
-    history_file = "generation_history.json"
+    global _history_lines
     
     try:
-        # Load existing history
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        else:
-            history = []
+        migrate_legacy_history()
         
-        # Add new item
-        history.insert(0, item.dict())
+        if _history_lines is None:
+            if os.path.exists(HISTORY_FILE):
+                with open(HISTORY_FILE, 'r') as f:
+                    _history_lines = sum(1 for line in f if line.strip())
+            else:
+                _history_lines = 0
         
-        # Keep only last 100 items
-        history = history[:100]
+        # Append the new item as a single line; the log is only rewritten when it is compacted
+        with open(HISTORY_FILE, 'a') as f:
+            f.write(json.dumps(item.dict()) + "\n")
+        _history_lines += 1
         
-        # Save back to file
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        if _history_lines > HISTORY_COMPACT_LINES:
+            _history_lines = compact_history()
         
         logger.info(f"Added item to history: {item.id}")
         return {"success": True, "message": "Item added to history"}
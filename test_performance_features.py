@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the storage and delivery paths of Nano Banana Image Generator
+These run offline against temporary directories and stubbed network calls
+"""
+
+import asyncio
+import hashlib
+import json
+
+import api_integrations
+import batch_processor
+import cache_manager
+import main
+
+def _history_item(item_id: str) -> "main.HistoryItem":
+    """Build a minimal history item"""
+    return main.HistoryItem(
+        id=item_id,
+        type="create",
+        prompt=f"prompt {item_id}",
+        format="jpg",
+        resolution="1024x1024",
+        image_url=f"http://example.com/{item_id}.jpg",
+        timestamp="2026-01-01T00:00:00"
+    )
+
+def test_history_migrates_legacy_json(tmp_path, monkeypatch):
+    """Test the legacy JSON array is converted to JSONL, oldest first"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "_history_lines", None)
+    
+    # The legacy file stores the newest item first
+    legacy = [_history_item("2").dict(), _history_item("1").dict()]
+    (tmp_path / main.LEGACY_HISTORY_FILE).write_text(json.dumps(legacy))
+    
+    asyncio.run(main.add_to_history(_history_item("3")))
+    
+    lines = (tmp_path / main.HISTORY_FILE).read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["1", "2", "3"]
+    
+    history = asyncio.run(main.get_history())["history"]
+    assert [item["id"] for item in history] == ["3", "2", "1"]
+
+def test_history_compacts_past_twice_the_limit(tmp_path, monkeypatch):
+    """Test the log is cut back to the newest HISTORY_LIMIT items once it passes the compaction size"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "_history_lines", None)
+    monkeypatch.setattr(main, "HISTORY_LIMIT", 5)
+    monkeypatch.setattr(main, "HISTORY_COMPACT_LINES", 10)
+    
+    for i in range(11):
+        asyncio.run(main.add_to_history(_history_item(str(i))))
+    
+    lines = (tmp_path / main.HISTORY_FILE).read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["6", "7", "8", "9", "10"]
+    assert main._history_lines == 5
+    
+    # Appends after a compaction keep counting from what was kept
+    asyncio.run(main.add_to_history(_history_item("11")))
+    assert main._history_lines == 6
+    assert len((tmp_path / main.HISTORY_FILE).read_text().splitlines()) == 6
+
+def test_cache_migrates_legacy_md5_entry_into_heap(tmp_path):
+    """Test a result cached under its MD5 key in its own JSON file moves into the heap on first read"""
+    result = {"url": "http://example.com/cat.jpg", "prompt": "a cat"}
+    legacy_key = hashlib.md5("a cat|jpg|1024x1024|high".encode()).hexdigest()
+    (tmp_path / f"{legacy_key}.json").write_text(json.dumps(result))
+    (tmp_path / "cache_index.json").write_text(json.dumps({
+        "entries": {legacy_key: {"prompt": "a cat", "created": 1.0, "last_accessed": 1.0, "extension": "jpg"}},
+        "metadata": {"created": 1.0, "last_cleanup": 1.0, "total_size_bytes": 0}
+    }))
+    
+    cache = cache_manager.CacheManager(cache_dir=str(tmp_path))
+    assert cache.get("a cat") == result
+    
+    # The entry now lives under the BLAKE2b key and in the heap, with the old file gone
+    key = cache._generate_key("a cat")
+    entry = cache.cache_index["entries"][key]
+    assert legacy_key not in cache.cache_index["entries"]
+    assert "offset" in entry
+    assert not (tmp_path / f"{legacy_key}.json").exists()
+    assert not (tmp_path / f"{key}.json").exists()
+    assert cache._total_bytes == entry["size_bytes"]
+    
+    # A fresh manager reads the migrated result straight from the heap
+    cache._flush_index_now()
+    reloaded = cache_manager.CacheManager(cache_dir=str(tmp_path))
+    assert reloaded.get("a cat") == result
+    assert reloaded._heap_dead == 0
+
+def test_cache_heap_overwrites_and_cached_hits_are_independent(tmp_path):
+    """Test overwritten results become dead heap bytes and hits never share one mutable dict"""
+    cache = cache_manager.CacheManager(cache_dir=str(tmp_path))
+    cache.set("a dog", {"url": "first"})
+    cache.set("a dog", {"url": "second"})
+    
+    first_size = len(cache_manager._pack_result({"url": "first"})[0])
+    assert cache._heap_dead == first_size
+    assert cache.get("a dog") == {"url": "second"}
+    
+    # Mutating one hit must not leak into the next
+    cache.get("a dog")["url"] = "changed"
+    assert cache.get("a dog") == {"url": "second"}
+    
+    cache._flush_index_now()
+    reloaded = cache_manager.CacheManager(cache_dir=str(tmp_path))
+    assert reloaded._heap_dead == first_size
+    assert reloaded.get("a dog") == {"url": "second"}
+
+def test_cache_dead_heap_bytes_count_toward_the_limit(tmp_path, monkeypatch):
+    """Test overwriting one entry cannot grow the heap past max_size_mb"""
+    # Keep the dead-ratio compaction out of the way so only the size limit can trigger it
+    monkeypatch.setattr(cache_manager, "HEAP_COMPACT_MIN_BYTES", 1 << 40)
+    cache = cache_manager.CacheManager(cache_dir=str(tmp_path), max_size_mb=0.1)
+    payload = "x" * 20000
+    
+    for i in range(20):
+        cache.set("a bird", {"data": payload, "i": i})
+        assert cache.heap_file.stat().st_size <= 0.1 * 1024 * 1024
+    
+    # Compaction reclaimed the overwritten copies without evicting the live entry
+    assert cache.get("a bird")["i"] == 19
+    assert cache._total_bytes + cache._heap_dead == cache.heap_file.stat().st_size
+
+class _RecordingSession:
+    """Stand-in for the webhook session that records posts and answers with a fixed status"""
+    
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+        self.posts = []
+    
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.posts.append((url, data, headers))
+        response = type("Response", (), {})()
+        response.status_code = self.status_code
+        return response
+
+def _webhook_manager(batch_size: int = 1) -> "api_integrations.WebhookManager":
+    """Build a webhook manager whose deliveries go to a recording session"""
+    manager = api_integrations.WebhookManager(batch_size=batch_size)
+    manager.session = _RecordingSession()
+    return manager
+
+def test_webhook_batches_events_and_signs_the_body(monkeypatch):
+    """Test batched events go out as one signed {"events": [...]} body once the batch is full"""
+    monkeypatch.setattr(api_integrations, "httpx", None)
+    manager = _webhook_manager(batch_size=3)
+    manager.register_webhook("hook", "http://example.com/hook", ["image_generated"], "s3cret")
+    
+    for i in range(2):
+        assert asyncio.run(manager.send_webhook_async("image_generated", {"i": i})) == []
+    assert manager.session.posts == []
+    
+    assert asyncio.run(manager.send_webhook_async("image_generated", {"i": 2})) == [True]
+    url, body, headers = manager.session.posts[0]
+    assert [event["data"]["i"] for event in json.loads(body)["events"]] == [0, 1, 2]
+    assert manager.verify_signature(body, headers[api_integrations.SIGNATURE_HEADER], "hook")
+
+def test_webhook_cooldown_skips_then_retries(monkeypatch):
+    """Test a failing webhook is paused with backoff, then retried and reset once it answers"""
+    monkeypatch.setattr(api_integrations, "httpx", None)
+    manager = _webhook_manager()
+    manager.register_webhook("hook", "http://example.com/hook", ["image_generated"])
+    webhook = manager.webhooks["hook"]
+    
+    manager.session.status_code = 500
+    assert asyncio.run(manager.send_webhook_async("image_generated", {})) == [False]
+    assert webhook["failures"] == 1
+    assert webhook["active"]
+    
+    # While cooling down the webhook is not even tried
+    assert asyncio.run(manager.send_webhook_async("image_generated", {})) == []
+    assert len(manager.session.posts) == 1
+    
+    webhook["cooldown_until"] = 0.0
+    manager.session.status_code = 200
+    assert asyncio.run(manager.send_webhook_async("image_generated", {})) == [True]
+    assert webhook["failures"] == 0
+    assert webhook["cooldown_until"] == 0.0
+
+def test_webhook_batches_are_held_during_cooldown(monkeypatch):
+    """Test batched events for a cooling-down webhook are queued and sent once the cooldown ends"""
+    monkeypatch.setattr(api_integrations, "httpx", None)
+    manager = _webhook_manager(batch_size=2)
+    manager.register_webhook("hook", "http://example.com/hook", ["image_generated"])
+    manager.webhooks["hook"]["cooldown_until"] = float("inf")
+    
+    for i in range(2):
+        assert asyncio.run(manager.send_webhook_async("image_generated", {"i": i})) == []
+    assert manager.session.posts == []
+    
+    manager.webhooks["hook"]["cooldown_until"] = 0.0
+    assert asyncio.run(manager.flush_webhooks_async()) == [True]
+    body = manager.session.posts[0][1]
+    assert [event["data"]["i"] for event in json.loads(body)["events"]] == [0, 1]
+
+def _recording_processor(monkeypatch) -> "batch_processor.BatchProcessor":
+    """Build a batch processor whose generation requests are answered locally and recorded"""
+    monkeypatch.setattr(batch_processor, "httpx", None)
+    processor = batch_processor.BatchProcessor(rate_limit=None)
+    processor.sent = []
+    
+    async def post_generation(client, payload):
+        processor.sent.append(payload["prompt"])
+        response = type("Response", (), {})()
+        response.status_code = 200
+        response.content = json.dumps({"data": [{"url": f"http://example.com/{len(processor.sent)}.jpg"}]}).encode()
+        return response
+    
+    processor._post_generation = post_generation
+    return processor
+
+def test_batch_dedup_fans_results_back_to_every_position(monkeypatch):
+    """Test repeated prompts are generated once and their result is copied to each original index"""
+    processor = _recording_processor(monkeypatch)
+    prompts = ["cat", "dog", "cat", "bird", "dog"]
+    
+    results = asyncio.run(processor.process_batch(prompts))
+    
+    assert sorted(processor.sent) == ["bird", "cat", "dog"]
+    assert [result["prompt"] for result in results] == prompts
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert results[0]["url"] == results[2]["url"]
+    assert results[1]["url"] == results[4]["url"]
+    assert len({results[0]["url"], results[1]["url"], results[3]["url"]}) == 3
+    
+    # Each position gets its own dict, so callers can annotate one without touching the others
+    assert results[0] is not results[2]
+
+def test_batch_without_dedup_generates_every_repeat(monkeypatch):
+    """Test dedup=False sends one request per prompt, repeats included"""
+    processor = _recording_processor(monkeypatch)
+    prompts = ["cat", "cat", "dog"]
+    
+    results = asyncio.run(processor.process_batch(prompts, dedup=False))
+    
+    assert len(processor.sent) == 3
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert results[0]["url"] != results[1]["url"]
@@ -1,14 +1,32 @@
 import os
 import time
+import base64
+import asyncio
+import aiofiles
 import requests
 from pathlib import Path
 from typing import Optional, Tuple
 from config_manager import config
 from main import VisualGPTProvider, upload_image_to_uguu, IMAGE_UPLOAD_URL
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Headers sent when downloading generated images
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Chunk size used when streaming downloaded images to disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 class ImageGenerator:
-    def __init__(self):
-        self.provider = VisualGPTProvider()
+    def __init__(self, session: Optional[requests.Session] = None):
+        # One pooled session for polling and uploads, kept for the generator's lifetime
+        self.session = session or requests.Session()
+        self.provider = VisualGPTProvider(session=self.session)
     
     async def create_image(self, prompt):
         """Create a new image from prompt"""
@@ -19,18 +37,18 @@ class ImageGenerator:
         # If it's a local file, upload it first
         if not image_path.startswith(('http://', 'https://')):
             print("Uploading local image...")
-            image_url = upload_local_image(image_path)
+            image_url = upload_local_image(image_path, self.session)
         else:
             image_url = image_path
         
         return await self.provider.generate_image(prompt, image_url)
 
-def upload_local_image(file_path):
+def upload_local_image(file_path, session: Optional[requests.Session] = None):
     """Upload a local image file and return URL"""
     try:
         with open(file_path, 'rb') as f:
             files = {'files[]': (os.path.basename(file_path), f, 'image/jpeg')}
-            response = requests.post('https://uguu.se/upload', files=files, timeout=30)
+            response = (session or requests).post('https://uguu.se/upload', files=files, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
@@ -58,53 +76,49 @@ def get_image_format_from_url(url: str) -> str:
     # Default to configured format
     return config.get('default_settings', 'output_format', 'jpg')
 
+def _resolve_format(content_type: str, image_url: str, custom_format: Optional[str]) -> str:
+    """Pick the output format from the user setting, the response content type or the URL"""
+    content_type = content_type.lower()
+    if custom_format:
+        return custom_format
+    elif 'image/png' in content_type:
+        return 'png'
+    elif 'image/jpeg' in content_type or 'image/jpg' in content_type:
+        return 'jpg'
+    elif 'image/webp' in content_type:
+        return 'webp'
+    return get_image_format_from_url(image_url)
+
+def _output_path(output_dir: str, file_format: str) -> str:
+    """Build a timestamped output path, creating the output directory if needed"""
+    timestamp = int(time.time())
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, f"generated_image_{timestamp}.{file_format}")
+
+def _verify_saved(filepath: str) -> str:
+    """Make sure a saved image is non-empty"""
+    if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+        return filepath
+    raise Exception("Saved file is empty or doesn't exist")
+
 def save_image_from_url(image_url: str, output_dir: str, custom_format: Optional[str] = None) -> str:
     """Download and save image from URL with format detection and better error handling"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
         # Make request with better error handling
-        response = requests.get(image_url, headers=headers, timeout=30, stream=True)
+        response = requests.get(image_url, headers=DOWNLOAD_HEADERS, timeout=30, stream=True)
         response.raise_for_status()
         
-        # Detect format
-        content_type = response.headers.get('content-type', '').lower()
-        if custom_format:
-            file_format = custom_format
-        elif 'image/png' in content_type:
-            file_format = 'png'
-        elif 'image/jpeg' in content_type or 'image/jpg' in content_type:
-            file_format = 'jpg'
-        elif 'image/webp' in content_type:
-            file_format = 'webp'
-        else:
-            file_format = get_image_format_from_url(image_url)
-        
-        # Generate filename with timestamp and format
-        timestamp = int(time.time())
-        filename = f"generated_image_{timestamp}.{file_format}"
-        filepath = os.path.join(output_dir, filename)
-        
-        # Ensure output directory exists
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Save image with progress for large files
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
+        file_format = _resolve_format(response.headers.get('content-type', ''), image_url, custom_format)
+        filepath = _output_path(output_dir, file_format)
         
+        # Stream the image to disk instead of buffering it
         with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                 if chunk:
                     f.write(chunk)
-                    downloaded += len(chunk)
         
         # Verify file was saved correctly
-        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-            return filepath
-        else:
-            raise Exception("Saved file is empty or doesn't exist")
+        return _verify_saved(filepath)
         
     except requests.exceptions.Timeout:
         raise Exception("Request timed out - the image server is taking too long to respond")
@@ -117,4 +131,53 @@ def save_image_from_url(image_url: str, output_dir: str, custom_format: Optional
     except OSError as e:
         raise Exception(f"File system error: {str(e)}")
     except Exception as e:
-        raise Exception(f"Failed to save image: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to save image: {str(e)}")
+
+async def save_image_from_url_async(client: Optional["httpx.AsyncClient"], image_url: str, output_dir: str,
+                                    custom_format: Optional[str] = None) -> str:
+    """Stream an image from URL to disk without blocking the event loop"""
+    # Without an httpx client, run the requests-based download on a worker thread
+    if client is None:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, save_image_from_url, image_url, output_dir, custom_format
+        )
+    
+    try:
+        async with client.stream('GET', image_url, headers=DOWNLOAD_HEADERS, timeout=30) as response:
+            response.raise_for_status()
+            
+            file_format = _resolve_format(response.headers.get('content-type', ''), image_url, custom_format)
+            filepath = _output_path(output_dir, file_format)
+            
+            async with aiofiles.open(filepath, 'wb') as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+        
+        return _verify_saved(filepath)
+        
+    except httpx.TimeoutException:
+        raise Exception("Request timed out - the image server is taking too long to respond")
+    except httpx.ConnectError:
+        raise Exception("Connection error - unable to reach the image server")
+    except httpx.HTTPStatusError as e:
+        raise Exception(f"HTTP error {e.response.status_code}: {e.response.reason_phrase}")
+    except httpx.RequestError as e:
+        raise Exception(f"Request failed: {str(e)}")
+    except OSError as e:
+        raise Exception(f"File system error: {str(e)}")
+    except Exception as e:
+        raise Exception(f"Failed to save image: {str(e)}")
+
+def save_image_from_b64(image_data: str, output_dir: str, custom_format: Optional[str] = None) -> str:
+    """Save an image the backend returned inline, skipping the download round trip"""
+    try:
+        filepath = _output_path(output_dir, custom_format or config.get('default_settings', 'output_format', 'jpg'))
+        with open(filepath, 'wb') as f:
+            f.write(base64.b64decode(image_data))
+        
+        return _verify_saved(filepath)
+        
+    except OSError as e:
+        raise Exception(f"File system error: {str(e)}")
+    except Exception as e:
+        raise Exception(f"Failed to save image: {str(e)}")